@@ -0,0 +1,72 @@
+# bench_classifier.py
+"""Benchmark: bundle-ID classification throughput on a synthetic mixed-store column.
+
+Run from the repo root:  python benchmarks/bench_classifier.py [n_ids]
+"""
+import re
+import sys
+import time
+import random
+import string
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from validation import BundleValidator  # noqa: E402
+from bundle_classifier import BundleClassifier  # noqa: E402
+
+
+def synthetic_ids(n: int, seed: int = 7) -> pd.Series:
+    """Build n IDs drawn from every store's ID shape plus some junk."""
+    rnd = random.Random(seed)
+    upper = string.ascii_uppercase + string.digits
+    lower = string.ascii_lowercase
+
+    def word():
+        return rnd.choice(lower) + "".join(rnd.choices(lower + string.digits, k=rnd.randint(2, 8)))
+
+    makers = [
+        lambda: f"com.{word()}.{word()}",                                   # android / gallaxy
+        lambda: str(rnd.randint(100_000_000, 9_999_999_999)),              # apple / roku / lg
+        lambda: f"id{rnd.randint(100_000_000, 9_999_999_999)}",            # apple
+        lambda: "B0" + "".join(rnd.choices(upper, k=8)),                   # amazon
+        lambda: "9" + "".join(rnd.choices(upper, k=11)),                   # microsoft
+        lambda: str(rnd.randint(10_000_000, 99_999_999)),                  # zeasn
+        lambda: f"G{rnd.randint(10_000_000, 99_999_999_999)}",             # samsung
+        lambda: f"vizio.{word()}",                                         # vizio
+        lambda: "".join(rnd.choices(string.printable[:70], k=rnd.randint(3, 20))),  # junk
+    ]
+    return pd.Series([rnd.choice(makers)() for _ in range(n)], dtype=object)
+
+
+def legacy_loop(ids) -> int:
+    """The old per-ID re.search loop (without its per-ID printing)."""
+    hits = 0
+    for bid in ids:
+        for pattern in BundleValidator.STORE_PATTERNS.values():
+            if re.search(pattern, bid, re.IGNORECASE):
+                hits += 1
+    return hits
+
+
+def main(n: int = 1_000_000):
+    ids = synthetic_ids(n)
+    print(f"Synthetic input: {n:,} IDs ({ids.nunique():,} unique)")
+
+    classifier = BundleClassifier(BundleValidator.STORE_PATTERNS)
+    start = time.perf_counter()
+    matrix = classifier.classify(ids)
+    elapsed = time.perf_counter() - start
+    print(f"Vectorized classifier : {elapsed:8.2f}s  {n / elapsed:>12,.0f} IDs/sec  ({int(matrix.values.sum()):,} matches)")
+
+    sample = ids.head(min(n, 100_000)).tolist()
+    start = time.perf_counter()
+    legacy_hits = legacy_loop(sample)
+    legacy_elapsed = time.perf_counter() - start
+    print(f"Legacy re.search loop : {legacy_elapsed:8.2f}s  {len(sample) / legacy_elapsed:>12,.0f} IDs/sec  "
+          f"({legacy_hits:,} matches on first {len(sample):,} IDs)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,91 @@
+# bench_extractor.py
+"""Benchmark: one-pass MetaExtractor vs the old per-tag XPath extractors.
+
+Times the field lookup alone on an already parsed tree, and parse + lookup
+together, for a meta-only store (Android) and a meta + body-link store
+(Apple/Amazon). Results are checked against the old code first.
+
+Run from the repo root:  python benchmarks/bench_extractor.py [page_kb] [repeat]
+"""
+import sys
+import time
+from pathlib import Path
+
+from lxml import html
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from store_validator.android_store import android_extractor  # noqa: E402
+from store_validator.apple_store import apple_extractor  # noqa: E402
+
+META_NAMES = {
+    "appstore_store_id": "appstore:store_id",
+    "appstore_bundle_id": "appstore:bundle_id",
+    "appstore_developer_url": "appstore:developer_url",
+}
+LINK_TEXTS = {
+    "developerWebsite": "Developer Website",
+    "appSupportUrl": "App Support",
+    "privacyPolicyUrl": "Privacy Policy",
+}
+
+
+def synthetic_page(kb: int) -> str:
+    """Store-like page: meta tags in <head>, ~kb KB of body, the wanted links near the end."""
+    head = (
+        '<html><head><title>App</title>'
+        '<meta name="viewport" content="width=device-width">'
+        '<meta name="appstore:developer_url" content="https://dev.example.com">'
+        '<meta name="appstore:bundle_id" content="com.example.app">'
+        '<meta name="appstore:store_id" content="123456789">'
+        '</head><body>'
+    )
+    block = '<div class="c"><span>Lorem ipsum dolor sit amet</span><a href="/x">link</a></div>'
+    links = (
+        '<ul><li><a href="https://dev.example.com">Developer Website</a></li>'
+        '<li><a href="https://dev.example.com/support">App Support</a></li>'
+        '<li><a href="https://dev.example.com/privacy">Privacy Policy</a></li></ul>'
+    )
+    return head + block * (kb * 1024 // len(block)) + links + "</body></html>"
+
+
+def xpath_fields(tree, with_links: bool) -> dict:
+    """The extractor code every store used before: one XPath per field."""
+    def get_meta_content(name):
+        result = tree.xpath(f'//meta[@name="{name}"]/@content')
+        return result[0] if result else None
+
+    data = {key: get_meta_content(name) for key, name in META_NAMES.items()}
+    if with_links:
+        for key, text in LINK_TEXTS.items():
+            result = tree.xpath(f'//a[contains(text(), "{text}")]/@href')
+            data[key] = result[0] if result else None
+    return data
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main(page_kb: int = 256, repeat: int = 20):
+    page = synthetic_page(page_kb)
+    tree = html.fromstring(page)
+    print(f"page {len(page) / 1024:.0f} KB, best of {repeat}")
+    for label, extractor, with_links in (("meta only (android)", android_extractor, False),
+                                         ("meta + links (apple)", apple_extractor, True)):
+        assert extractor.extract_tree(tree) == xpath_fields(tree, with_links), label
+        old = best_of(lambda: xpath_fields(tree, with_links), repeat)
+        new = best_of(lambda: extractor.extract_tree(tree), repeat)
+        old_full = best_of(lambda: xpath_fields(html.fromstring(page), with_links), repeat)
+        new_full = best_of(lambda: extractor.extract(page), repeat)
+        print(f"  {label:<22} lookup: xpath {old:8.3f}ms  one-pass {new:8.3f}ms  ({old / new:6.1f}x)   "
+              f"parse+lookup: xpath {old_full:7.2f}ms  one-pass {new_full:7.2f}ms")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*args)
@@ -0,0 +1,66 @@
+# bench_parse_lag.py
+"""Benchmark: event-loop lag while store pages are parsed inline vs in a pool.
+
+Simulates a crawl: many concurrent "requests" that wait on the network and
+then parse a large Play-Store-like page with the Android extractor.
+
+Run from the repo root:  python benchmarks/bench_parse_lag.py [n_pages] [page_kb]
+"""
+import sys
+import time
+import asyncio
+import random
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from store_validator.android_store import appstoreManager  # noqa: E402
+from store_validator.parse_pool import ParsePool  # noqa: E402
+from store_validator.loop_lag import LoopLagMonitor  # noqa: E402
+
+
+def synthetic_page(kb: int) -> str:
+    """A <head> with the appstore meta tags followed by ~kb KB of nested markup."""
+    head = (
+        '<html><head><title>App</title>'
+        '<meta name="appstore:developer_url" content="https://dev.example.com">'
+        '<meta name="appstore:bundle_id" content="com.example.app">'
+        '<meta name="appstore:store_id" content="com.example.app">'
+        '</head><body>'
+    )
+    block = '<div class="c"><span>Lorem ipsum dolor sit amet</span><a href="/x">link</a></div>'
+    return head + block * (kb * 1024 // len(block)) + "</body></html>"
+
+
+async def crawl(pool: ParsePool, page: str, n: int, concurrency: int = 32) -> dict:
+    monitor = LoopLagMonitor(interval=0.01)
+    semaphore = asyncio.Semaphore(concurrency)
+    rnd = random.Random(3)
+
+    async def one():
+        async with semaphore:
+            await asyncio.sleep(rnd.uniform(0.01, 0.05))  # network
+            meta = await pool.parse(appstoreManager.extract_appstore_meta_tags, page)
+            assert meta["appstore_developer_url"] == "https://dev.example.com"
+
+    monitor.start()
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(n)))
+    wall = time.perf_counter() - start
+    lag = await monitor.stop()
+    return {"wall_s": round(wall, 2), **lag}
+
+
+def main(n: int = 300, page_kb: int = 1024):
+    page = synthetic_page(page_kb)
+    print(f"{n} pages of {len(page) / 1024:.0f} KB, 32 concurrent requests")
+    for mode in ("inline", "thread", "process"):
+        pool = ParsePool(mode=mode, workers=4)
+        result = asyncio.run(crawl(pool, page, n))
+        pool.close()
+        print(f"  {mode:<8} wall {result['wall_s']:>6}s   loop lag mean {result['mean_ms']:>7}ms  "
+              f"p99 {result['p99_ms']:>7}ms  max {result['max_ms']:>7}ms")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    main(*args)
@@ -0,0 +1,109 @@
+# bundle_cache.py
+import sqlite3
+import pandas as pd
+from pathlib import Path
+from loguru import logger
+from typing import Iterable, Optional, Set
+
+
+class BundleCache:
+    """Keyed (bundle_id, store) routing cache backed by SQLite.
+
+    Lookups hit the primary-key index, a whole batch is resolved with one
+    join, and saving only inserts rows that are not already present.
+    """
+
+    def __init__(self, db_path: Path, legacy_parquet: Optional[Path] = None):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(exist_ok=True, parents=True)
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        # Bounded page cache (64 MB) shared by the index and the run tables
+        self.conn.execute("PRAGMA cache_size=-65536")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS routes (
+                   bundle_id TEXT NOT NULL,
+                   store     TEXT NOT NULL,
+                   PRIMARY KEY (bundle_id, store)
+               ) WITHOUT ROWID"""
+        )
+        self.conn.commit()
+
+        if legacy_parquet is not None:
+            self.import_legacy(Path(legacy_parquet))
+
+    def import_legacy(self, parquet_path: Path):
+        """One-time import of the old parquet cache when the database is still empty."""
+        if not parquet_path.exists() or len(self) > 0:
+            return
+        try:
+            legacy_df = pd.read_parquet(parquet_path, columns=["bundle_id", "store"])
+        except Exception as e:
+            logger.error(f"Could not import legacy cache {parquet_path}: {e}")
+            return
+        added = self.add(legacy_df)
+        logger.info(f"Imported {added} routes from legacy cache {parquet_path}")
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM routes").fetchone()[0]
+
+    def load_batch(self, bundle_ids: Iterable[str]):
+        """Fill the temp batch_ids table with the given IDs."""
+        cur = self.conn.cursor()
+        cur.execute("CREATE TEMP TABLE IF NOT EXISTS batch_ids (bundle_id TEXT PRIMARY KEY)")
+        cur.execute("DELETE FROM batch_ids")
+        # Sorted keys turn random B-tree inserts into mostly sequential ones
+        cur.executemany(
+            "INSERT OR IGNORE INTO batch_ids (bundle_id) VALUES (?)",
+            ((bid,) for bid in sorted(str(bid) for bid in bundle_ids)),
+        )
+        return cur
+
+    def lookup(self, bundle_ids: Iterable[str]) -> pd.DataFrame:
+        """Return every cached (bundle_id, store) row for the given IDs in one query."""
+        cur = self.load_batch(bundle_ids)
+        rows = cur.execute(
+            "SELECT r.bundle_id, r.store FROM batch_ids b JOIN routes r ON r.bundle_id = b.bundle_id"
+        ).fetchall()
+        cur.execute("DELETE FROM batch_ids")
+        self.conn.commit()
+        return pd.DataFrame(rows, columns=["bundle_id", "store"])
+
+    def begin_run(self):
+        """Start a new routing run; IDs seen in earlier runs no longer count as duplicates."""
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS run_ids (bundle_id TEXT PRIMARY KEY) WITHOUT ROWID")
+        self.conn.execute("DELETE FROM run_ids")
+        self.conn.commit()
+
+    def unseen(self, bundle_ids: Iterable[str]) -> Set[str]:
+        """Return the IDs not yet seen in this run and mark them as seen.
+
+        The seen-set lives in SQLite's file-backed temp store, so streaming a
+        huge input does not grow memory with every distinct ID.
+        """
+        cur = self.load_batch(bundle_ids)
+        rows = cur.execute(
+            "SELECT b.bundle_id FROM batch_ids b "
+            "WHERE NOT EXISTS (SELECT 1 FROM run_ids r WHERE r.bundle_id = b.bundle_id)"
+        ).fetchall()
+        cur.execute("INSERT OR IGNORE INTO run_ids (bundle_id) SELECT bundle_id FROM batch_ids")
+        cur.execute("DELETE FROM batch_ids")
+        self.conn.commit()
+        return {row[0] for row in rows}
+
+    def add(self, df: pd.DataFrame) -> int:
+        """Append new (bundle_id, store) rows; existing keys are left untouched."""
+        if df.empty:
+            return 0
+        before = self.conn.total_changes
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO routes (bundle_id, store) VALUES (?, ?)",
+            df[["bundle_id", "store"]].astype(str).sort_values(["bundle_id", "store"])
+            .itertuples(index=False, name=None),
+        )
+        self.conn.commit()
+        return self.conn.total_changes - before
+
+    def close(self):
+        self.conn.close()
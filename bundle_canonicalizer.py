@@ -0,0 +1,96 @@
+# bundle_canonicalizer.py
+import re
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from loguru import logger
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+# (store, pattern) pairs; the single capture group is the canonical ID.
+# Checked in order and case-insensitively, first match wins. A match also
+# fixes the store.
+URL_RULES: List[Tuple[str, str]] = [
+    ("android", r"play\.google\.com/store/apps/details\?(?:.*&)?id=([A-Za-z][\w]*(?:\.[A-Za-z_][\w]*)+)"),
+    ("apple", r"(?:apps|itunes)\.apple\.com/.*?/id(\d{6,})"),
+    ("apple", r"^id(\d{6,})$"),
+    ("amazon", r"amazon\.[a-z.]+/(?:.*/)?(?:dp|gp/product)/([A-Za-z0-9]{10})"),
+    ("amazon", r"^/?dp/([A-Za-z0-9]{10})/?$"),
+    ("microsoft", r"(?:apps|www)\.microsoft\.com/.*?/?(?:detail|store/apps)/(?:[^/?#]+/)?(9[A-Za-z0-9]{8,15})"),
+    ("gallaxy", r"galaxystore\.samsung\.com/(?:api/)?detail/([A-Za-z][\w]*(?:\.[A-Za-z_][\w]*)+)"),
+    ("samsung", r"samsung\.com/.*/appstore/app/(G\d+)"),
+    ("playstation", r"/product/([A-Z0-9_\-]+)"),
+]
+
+# Stores whose IDs are case-insensitive and conventionally upper case
+UPPERCASE_STORES = ("amazon", "microsoft", "playstation", "samsung")
+
+
+@dataclass
+class BundleCanonicalizer:
+    """Turns raw bundle-ID inputs into (store_hint, canonical bundle_id) pairs.
+
+    Store URLs and prefixed forms (id123, /dp/ASIN) are reduced to the bare ID
+    and pinned to their store; Excel float artifacts like "70238.0" lose the
+    ".0". Values without a hint are left for the pattern classifier.
+    """
+    url_rules: List[Tuple[str, str]] = field(default_factory=lambda: list(URL_RULES))
+
+    def __post_init__(self):
+        self.last_stats: Dict[str, float] = {}
+
+    def canonicalize(self, values: pd.Series) -> pd.DataFrame:
+        """Return raw, bundle_id and store_hint columns for every non-null input."""
+        raw = values.dropna().astype(str).str.strip()
+        raw = raw[raw != ""].reset_index(drop=True)
+        # Each distinct raw value is canonicalized once
+        uniques = pd.Series(raw.unique(), dtype=object)
+
+        arr = pa.array(uniques, type=pa.string())
+        canonical = uniques.copy()
+        hints = pd.Series(None, index=uniques.index, dtype=object)
+
+        floats = pc.match_substring_regex(arr, r"^\d+\.0+$").to_numpy(zero_copy_only=False)
+        if floats.any():
+            canonical[floats] = canonical[floats].str.replace(r"\.0+$", "", regex=True)
+
+        # Only values that look like a URL or a prefixed ID can match a rule
+        maybe_rule = pc.or_(
+            pc.match_substring(arr, "/"),
+            pc.starts_with(arr, "id", ignore_case=True),
+        ).to_numpy(zero_copy_only=False)
+
+        for store, pattern in self.url_rules:
+            pending = hints.isna() & maybe_rule
+            if not pending.any():
+                break
+            extracted = canonical[pending].str.extract(pattern, flags=re.IGNORECASE, expand=False)
+            found = extracted.dropna()
+            if found.empty:
+                continue
+            if store in UPPERCASE_STORES:
+                found = found.str.upper()
+            canonical.loc[found.index] = found
+            hints.loc[found.index] = store
+
+        # URL query strings / trailing slashes left on unhinted values
+        unhinted = hints.isna() & maybe_rule
+        canonical.loc[unhinted] = canonical[unhinted].str.rstrip("/")
+
+        mapping = pd.DataFrame({"raw": uniques, "bundle_id": canonical, "store_hint": hints})
+        result = pd.DataFrame({"raw": raw}).merge(mapping, on="raw", how="left")
+
+        pairs = result[["bundle_id", "store_hint"]].drop_duplicates()
+        n_unique_raw = len(uniques)
+        n_canonical = int(result["bundle_id"].nunique())
+        self.last_stats = {
+            "rows": len(result),
+            "unique_raw": n_unique_raw,
+            "unique_canonical": n_canonical,
+            "pairs": len(pairs),
+            "hinted": int(mapping["store_hint"].notna().sum()),
+            "dedupe_ratio": round(n_unique_raw / n_canonical, 4) if n_canonical else 1.0,
+        }
+        logger.info(f"Canonicalized {n_unique_raw} distinct inputs into {n_canonical} bundle IDs "
+                    f"(dedupe ratio {self.last_stats['dedupe_ratio']})")
+        return result
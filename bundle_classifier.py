@@ -0,0 +1,87 @@
+# bundle_classifier.py
+import re
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from loguru import logger
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Union
+
+# RE2 (pyarrow) has no lookarounds, so stores whose pattern uses them get an
+# equivalent list of patterns that must ALL match.
+VECTOR_PATTERNS: Dict[str, List[str]] = {
+    "amazon": [r"^(?:/dp/)?[A-Z0-9]{10}$", r"^(?:/dp/)?[0-9]*[A-Z]"],
+}
+
+ColumnLike = Union[pd.Series, pa.Array, pa.ChunkedArray, list]
+
+
+@dataclass
+class BundleClassifier:
+    """Labels a whole column of bundle IDs against the store patterns in one pass."""
+    patterns: Dict[str, str]
+    vector_patterns: Dict[str, List[str]] = field(default_factory=lambda: dict(VECTOR_PATTERNS))
+
+    def __post_init__(self):
+        # Compile once; used when pyarrow cannot evaluate a pattern
+        self.compiled = {store: re.compile(p, re.IGNORECASE) for store, p in self.patterns.items()}
+        self.stores = list(self.patterns.keys())
+
+    @staticmethod
+    def to_arrow(values: ColumnLike) -> pa.Array:
+        """Convert any supported column type to a flat Arrow string array."""
+        if isinstance(values, pa.ChunkedArray):
+            values = values.combine_chunks()
+        elif isinstance(values, pd.Series):
+            values = pa.array(values.astype("string"), from_pandas=True)
+        elif not isinstance(values, pa.Array):
+            values = pa.array([None if v is None else str(v) for v in values], type=pa.string())
+        if not pa.types.is_string(values.type) and not pa.types.is_large_string(values.type):
+            values = pc.cast(values, pa.string())
+        return values
+
+    def match_store(self, store: str, uniques: pa.Array) -> pa.Array:
+        """Boolean mask of which unique IDs match the given store."""
+        rules = self.vector_patterns.get(store, [self.patterns[store]])
+        try:
+            mask = None
+            for rule in rules:
+                hit = pc.match_substring_regex(uniques, rule, ignore_case=True)
+                mask = hit if mask is None else pc.and_(mask, hit)
+            return pc.fill_null(mask, False)
+        except pa.ArrowInvalid as e:
+            logger.debug(f"Falling back to Python regex for {store}: {e}")
+            compiled = self.compiled[store]
+            return pa.array(
+                [v is not None and compiled.search(v) is not None for v in uniques.to_pylist()],
+                type=pa.bool_(),
+            )
+
+    def classify(self, values: ColumnLike) -> pd.DataFrame:
+        """Return a boolean frame (one column per store) aligned to the input rows."""
+        arr = self.to_arrow(values)
+        encoded = pc.dictionary_encode(arr)
+        uniques = encoded.dictionary
+        indices = pc.fill_null(encoded.indices, 0).to_numpy(zero_copy_only=False).astype("int64")
+        valid = arr.is_valid().to_numpy(zero_copy_only=False)
+
+        # Only the distinct values are matched, then broadcast back to rows
+        matrix = {}
+        for store in self.stores:
+            if len(uniques) == 0:
+                matrix[store] = valid & False
+                continue
+            mask = self.match_store(store, uniques).to_numpy(zero_copy_only=False)
+            matrix[store] = mask[indices] & valid
+
+        index = values.index if isinstance(values, pd.Series) else None
+        return pd.DataFrame(matrix, index=index, columns=self.stores)
+
+    def route(self, values: ColumnLike, matrix: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """Return one (bundle_id, store) row per matching store, like the old routing loop."""
+        arr = self.to_arrow(values)
+        matrix = (self.classify(arr) if matrix is None else matrix).reset_index(drop=True)
+        matrix.insert(0, "bundle_id", arr.to_pandas())
+        routed = matrix.melt(id_vars="bundle_id", var_name="store", value_name="matched")
+        routed = routed[routed["matched"]][["bundle_id", "store"]]
+        return routed.reset_index(drop=True)
@@ -0,0 +1,165 @@
+# combine.py
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pathlib import Path
+from loguru import logger
+from typing import Dict, Iterable, List, Optional, Tuple
+from freshness import CHANGE_COLUMNS, changed_rows, latest_per_bundle, prefer_fresher, url_changes
+from permanent_store import FETCHED_AT, PERMANENT_COLUMNS, PermanentStore, file_timestamp
+from store_validator.parquet_sink import DICT_STRING
+
+# Column holding each store's developer URL, in order of preference
+STORE_DEVELOPER_COLS: Dict[str, List[str]] = {
+    "apple": ["sellerUrl"],
+    "android": ["appstore_developer_url"],
+    "amazon": ["appstore_developer_url", "privacyPolicyUrl"],
+    "microsoft": ["appstore_developer_url"],
+    "gallaxy": ["site"],
+    "samsung": ["appstore_developer_url"],
+    "zeasn": ["appstore_developer_url"],
+    "vizio": ["data_developer_url"],
+    "roku": ["appstore_developer_url"],
+    "lg": ["developer_url"],
+}
+DEFAULT_DEVELOPER_COLS = ["developer_url"]
+
+COMBINED_COLUMNS = PERMANENT_COLUMNS
+CHANGES_SCHEMA = pa.schema([("bundle_id", pa.string()), ("change", DICT_STRING), ("developer_url", pa.string()),
+                            ("previous_url", pa.string()), ("source_store", DICT_STRING), ("fetched_at", FETCHED_AT)])
+COMBINED_SCHEMA = pa.schema([("bundle_id", pa.string()), ("developer_url", pa.string()),
+                             ("source_store", pa.string()), ("fetched_at", FETCHED_AT)])
+
+
+def developer_column(store: str, names: Iterable[str]) -> Optional[str]:
+    """The first of the store's developer URL columns that the file has."""
+    names = set(names)
+    return next((col for col in STORE_DEVELOPER_COLS.get(store, DEFAULT_DEVELOPER_COLS) if col in names), None)
+
+
+def scan_outputs(files: Iterable[Path]) -> pd.DataFrame:
+    """bundle_id, developer_url, source_store and fetched_at of every store output.
+
+    Only the footers are read up front, to pick each store's developer
+    column; the rows then come from one multi-threaded ``pyarrow.dataset``
+    scan that reads just those columns (dictionary columns are cast to plain
+    strings by the scan). The sinks stamp every row with its ``fetched_at``;
+    only files written before they did are dated by their mtime.
+    """
+    picked: Dict[str, Tuple[str, Optional[str], pd.Timestamp]] = {}
+    for file in files:
+        try:
+            names = pq.read_schema(file).names
+        except Exception as e:
+            logger.error(f"Error reading {file}: {e}")
+            continue
+        if "bundle_id" not in names:
+            logger.warning(f"Skipping {file.name}: no bundle_id column")
+            continue
+        picked[str(file)] = (file.stem, developer_column(file.stem, names), file_timestamp(file))
+    if not picked:
+        return COMBINED_SCHEMA.empty_table().to_pandas()
+
+    dev_cols = sorted({dev_col for _, dev_col, _ in picked.values() if dev_col})
+    scan_schema = pa.schema([("bundle_id", pa.string()), *[(col, pa.string()) for col in dev_cols],
+                             ("fetched_at", FETCHED_AT)])
+    dataset = ds.dataset(list(picked), format="parquet", schema=scan_schema)
+
+    batches = []
+    for tagged in dataset.scanner(use_threads=True).scan_batches():
+        batch = tagged.record_batch
+        if not batch.num_rows:
+            continue
+        store, dev_col, stamp = picked[tagged.fragment.path]
+        n = batch.num_rows
+        batches.append(pa.record_batch([
+            batch.column("bundle_id"),
+            batch.column(dev_col) if dev_col else pa.array([""] * n, pa.string()),
+            pa.array([store] * n, pa.string()),
+            pc.fill_null(batch.column("fetched_at"), pa.scalar(stamp, FETCHED_AT)),
+        ], schema=COMBINED_SCHEMA))
+    return pa.Table.from_batches(batches, schema=COMBINED_SCHEMA).to_pandas()
+
+
+def write_combined(df: pd.DataFrame, path: Path):
+    df = df[COMBINED_COLUMNS].copy()
+    # A handful of store names repeated on every row: stored as a dictionary column
+    df["source_store"] = df["source_store"].astype("category")
+    df.to_parquet(path, index=False)
+    logger.success(f"Merged output saved to: {path} ({len(df)} bundle IDs)")
+
+
+def write_changes(changes: pd.DataFrame, changes_dir: Path) -> Optional[Path]:
+    """Write one run's developer_url changes as changes_dir/run_date=<day>/changes-<time>.parquet.
+
+    Consumers apply the files newer than the last one they read instead of
+    reloading the combined file. Nothing is written when nothing changed.
+    """
+    if changes.empty:
+        logger.info("No developer_url changes in this run")
+        return None
+    now = pd.Timestamp.now(tz="UTC")
+    path = Path(changes_dir) / f"run_date={now:%Y-%m-%d}" / f"changes-{now:%Y%m%dT%H%M%S%f}.parquet"
+    partial = path.with_name(path.name + ".partial")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pq.write_table(pa.Table.from_pandas(changes[CHANGE_COLUMNS], schema=CHANGES_SCHEMA, preserve_index=False),
+                   partial)
+    os.replace(partial, path)
+    counts = changes["change"].value_counts().to_dict()
+    logger.success(f"Wrote {len(changes)} developer_url changes to {path} {counts}")
+    return path
+
+
+def combine_outputs(output_dir: Path, temp_file: Path, permanent: PermanentStore,
+                    changes_dir: Optional[Path] = None,
+                    backfill_ids: Iterable[str] = ()) -> Tuple[pd.DataFrame, int, int]:
+    """Merge the store outputs once into ``temp_file`` and upsert what changed into ``permanent``.
+
+    The outputs are scanned a single time (see ``scan_outputs``) and only
+    this run's bundle_ids are looked up in the permanent store. Each URL is
+    reconciled with the stored one, which is kept unless this run's row is
+    newer and found one, and one row per bundle_id is written to
+    ``temp_file``, together with the stored rows of ``backfill_ids`` (the
+    IDs freshness skipped), so it still covers every routed ID. Only rows
+    whose URL or fetched_at changed are appended to the store; with
+    ``changes_dir`` the added, changed and removed URLs, as the stores
+    returned them before reconciliation, are also written out (see
+    ``write_changes``). Returns the run's rows, the number
+    upserted and the number of URL changes.
+    """
+    merged_names = {Path(temp_file).name, permanent.legacy_file.name}
+    files = [f for f in sorted(Path(output_dir).glob("*.parquet")) if f.name not in merged_names]
+    logger.info(f"Found Parquet files: {[f.name for f in files]}")
+
+    run = scan_outputs(files)
+    run_ids = set(run["bundle_id"])
+    backfill = set(backfill_ids) - run_ids
+    if run.empty and not backfill:
+        logger.warning("No store output rows found for merging")
+        write_combined(run, temp_file)
+        return run, 0, 0
+
+    # One read of the store serves the reconciliation and the backfill
+    stored = permanent.latest(run_ids | backfill)
+    previous = stored.set_index("bundle_id")[["developer_url", "fetched_at"]]
+    logger.info(f"Loaded {len(previous)} existing developer URLs from {permanent.root}")
+    if run.empty:
+        logger.warning("No store output rows found for merging")
+    else:
+        # Changes come from what the stores returned; the stored URL is only put back afterwards
+        run = latest_per_bundle(run)
+        changes = url_changes(run, previous)
+        run = prefer_fresher(run, previous)
+    kept = stored[stored["bundle_id"].isin(backfill)]
+    if not kept.empty:
+        logger.info(f"Backfilled {len(kept)} still-fresh IDs from {permanent.root}")
+    write_combined(pd.concat([run, kept[COMBINED_COLUMNS]], ignore_index=True) if not kept.empty else run,
+                   temp_file)
+    if run.empty:
+        return run, 0, 0
+    if changes_dir is not None:
+        write_changes(changes, changes_dir)
+    return run, permanent.upsert(changed_rows(run, previous)), len(changes)
@@ -0,0 +1,154 @@
+# freshness.py
+import numpy as np
+import pandas as pd
+from loguru import logger
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Set
+from routing_engine import LOCAL_STORES
+from permanent_store import PermanentStore
+
+# Days a resolved developer_url stays valid before the ID is fetched again
+DEFAULT_TTL_DAYS: Dict[str, float] = {
+    "apple": 30,
+    "android": 14,
+    "amazon": 30,
+    "microsoft": 30,
+    "gallaxy": 30,
+    "samsung": 30,
+    "zeasn": 30,
+    "playstation": 30,
+    # Local catalog lookups cost nothing, so they are always redone
+    **{store: 0 for store in LOCAL_STORES},
+}
+
+
+def prefer_fresher(df: pd.DataFrame, existing: pd.DataFrame) -> pd.DataFrame:
+    """Keep the previously resolved URL unless this row is newer and actually has one."""
+    if existing.empty or df.empty:
+        return df
+    prev = existing.reindex(df["bundle_id"].to_numpy())
+    prev_url = prev["developer_url"].fillna("").astype(str).str.strip().to_numpy()
+    new_url = df["developer_url"].fillna("").astype(str).str.strip().to_numpy()
+    # Plain UTC datetime64 values: a tz-aware .to_numpy() boxes every row in a Timestamp
+    new_at = df["fetched_at"].to_numpy(dtype="datetime64[ns]")
+    prev_at = prev["fetched_at"].to_numpy(dtype="datetime64[ns]")
+    newer = (new_at > prev_at) & (new_url != "")
+    keep_prev = (prev_url != "") & ~newer
+    df = df.copy()
+    df["developer_url"] = np.where(keep_prev, prev["developer_url"].to_numpy(), df["developer_url"].to_numpy())
+    df["fetched_at"] = pd.to_datetime(np.where(keep_prev, prev_at, new_at), utc=True)
+    return df
+
+
+def url_hash(urls: pd.Series) -> np.ndarray:
+    """64-bit hash of each developer_url; missing and "" hash alike."""
+    return pd.util.hash_array(urls.fillna("").astype(str).to_numpy(dtype=object))
+
+
+EMPTY_URL_HASH = url_hash(pd.Series([""]))[0]
+CHANGE_COLUMNS = ["bundle_id", "change", "developer_url", "previous_url", "source_store", "fetched_at"]
+
+
+def changed_rows(df: pd.DataFrame, existing: pd.DataFrame) -> pd.DataFrame:
+    """Rows whose developer_url or fetched_at differ from ``existing`` (all rows for unknown IDs)."""
+    if existing.empty or df.empty:
+        return df
+    prev = existing.reindex(df["bundle_id"].to_numpy())
+    same_url = url_hash(prev["developer_url"]) == url_hash(df["developer_url"])
+    # NaT never equals NaT, so IDs missing from ``existing`` count as changed
+    same_at = prev["fetched_at"].to_numpy(dtype="datetime64[ns]") == df["fetched_at"].to_numpy(dtype="datetime64[ns]")
+    return df[~(same_url & same_at)]
+
+
+def url_changes(df: pd.DataFrame, existing: pd.DataFrame) -> pd.DataFrame:
+    """developer_url changes of ``df`` against the previous snapshot ``existing``.
+
+    ``df`` must hold what the stores returned, before ``prefer_fresher``
+    puts stored URLs back. Rows are compared by URL hash: ``added`` had no
+    URL before, ``removed`` has none now, ``changed`` has a different one.
+    Only rows fetched after the stored one count, so a stale output file
+    cannot report a removal. Unchanged rows are dropped.
+    """
+    prev = existing.reindex(df["bundle_id"].to_numpy())
+    prev_url = prev["developer_url"]
+    old, new = url_hash(prev_url), url_hash(df["developer_url"])
+    had, has = old != EMPTY_URL_HASH, new != EMPTY_URL_HASH
+    # Written as "not older" so IDs missing from ``existing`` (NaT) count as newer
+    newer = ~(df["fetched_at"].to_numpy(dtype="datetime64[ns]") <= prev["fetched_at"].to_numpy(dtype="datetime64[ns]"))
+    change = np.select([~had & has, had & ~has, had & has & (old != new)],
+                       ["added", "removed", "changed"], default="")
+    change = np.where(newer, change, "")
+    changes = df.assign(change=change, previous_url=prev_url.fillna("").to_numpy())
+    return changes.loc[change != "", CHANGE_COLUMNS].reset_index(drop=True)
+
+
+def latest_per_bundle(df: pd.DataFrame) -> pd.DataFrame:
+    """One row per bundle_id: the newest row with a URL, else the newest row."""
+    has_url = (df["developer_url"].fillna("").astype(str).str.strip() != "").to_numpy()
+    # lexsort is stable and sorts by its last key first; NaT sorts last as with sort_values
+    order = np.lexsort((df["fetched_at"].to_numpy(dtype="datetime64[ns]"), has_url))
+    last = ~df["bundle_id"].iloc[order].duplicated(keep="last").to_numpy()
+    return df.iloc[np.sort(order[last])]
+
+
+@dataclass
+class FreshnessPolicy:
+    """Skips routed IDs whose developer_url was resolved recently.
+
+    Ages come from the ``fetched_at`` of each ID's latest row in the permanent
+    store; rows written before that column existed are dated by their file's
+    mtime. IDs that
+    were fetched but came back without a URL are retried after
+    ``empty_ttl_days``. The IDs skipped this way are kept in ``skipped_ids``
+    so the run's combined file can still list them.
+    """
+    permanent: PermanentStore = field(default_factory=PermanentStore)
+    ttl_days: Dict[str, float] = field(default_factory=lambda: dict(DEFAULT_TTL_DAYS))
+    default_ttl_days: float = 30
+    empty_ttl_days: float = 7
+    enabled: bool = True
+
+    def __post_init__(self):
+        self.known: Optional[pd.DataFrame] = None
+        self.skipped_ids: Set[str] = set()
+
+    def load(self) -> pd.DataFrame:
+        """bundle_id -> (fetched_at, has_url) from the permanent store, loaded once."""
+        if self.known is not None:
+            return self.known
+        known = pd.DataFrame({"fetched_at": pd.Series(dtype="datetime64[ns, UTC]"),
+                              "has_url": pd.Series(dtype=bool)})
+        if self.enabled:
+            try:
+                resolved = self.permanent.resolved()
+                known = pd.DataFrame({
+                    "fetched_at": resolved["fetched_at"],
+                    "has_url": resolved["developer_url"].fillna("").astype(str).str.strip() != "",
+                })
+                logger.info(f"Freshness: {len(known)} previously resolved IDs loaded from {self.permanent.root}")
+            except Exception as e:
+                logger.error(f"Freshness: could not read {self.permanent.root}, nothing will be skipped: {e}")
+        self.known = known
+        return known
+
+    def fresh_mask(self, routes: pd.DataFrame, now: Optional[pd.Timestamp] = None) -> pd.Series:
+        """True for (bundle_id, store) routes that are still within their store's TTL."""
+        known = self.load()
+        if routes.empty or known.empty:
+            return pd.Series(False, index=routes.index)
+        now = now if now is not None else pd.Timestamp.now(tz="UTC")
+        prev = known.reindex(routes["bundle_id"].to_numpy())
+        age_days = (now - prev["fetched_at"]).dt.total_seconds().to_numpy() / 86400
+        ttl = routes["store"].map(self.ttl_days).fillna(self.default_ttl_days).to_numpy(dtype=float)
+        has_url = prev["has_url"].eq(True).to_numpy()
+        ttl = np.where(has_url, ttl, np.minimum(ttl, self.empty_ttl_days))
+        # Unknown IDs have a NaN age, which is never fresh
+        return pd.Series(age_days < ttl, index=routes.index)
+
+    def filter(self, routes: pd.DataFrame) -> pd.DataFrame:
+        """Routes that still need a fetch."""
+        if not self.enabled or routes.empty:
+            return routes
+        fresh = self.fresh_mask(routes)
+        self.skipped_ids.update(routes.loc[fresh, "bundle_id"].astype(str))
+        return routes[~fresh]
@@ -0,0 +1,90 @@
+# input_reader.py
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.dataset as ds
+from pathlib import Path
+from loguru import logger
+from typing import Iterator, Union
+
+InputSource = Union[str, Path, pd.DataFrame, pa.Table, pa.RecordBatch]
+
+CSV_SUFFIXES = (".csv", ".tsv", ".txt")
+NDJSON_SUFFIXES = (".ndjson", ".jsonl", ".json")
+EXCEL_SUFFIXES = (".xlsx", ".xls")
+
+
+def missing_column(column: str, source) -> ValueError:
+    error_msg = f"Missing '{column}' column in {source}"
+    logger.error(error_msg)
+    return ValueError(f"Input must contain a '{column}' column")
+
+
+def iter_bundle_id_chunks(source: InputSource, column: str = "bundle_id",
+                          chunk_size: int = 500_000) -> Iterator[pd.Series]:
+    """Yield the bundle-ID column of any supported input in chunks of at most chunk_size rows.
+
+    DataFrames and Arrow tables are sliced without copying the other columns;
+    parquet, CSV and NDJSON files are streamed so only one chunk is in memory.
+    Excel cannot be streamed and is read column-only in one go.
+    """
+    if isinstance(source, pd.DataFrame):
+        if column not in source.columns:
+            raise missing_column(column, "DataFrame")
+        series = source[column]
+        for start in range(0, len(series), chunk_size):
+            yield series.iloc[start:start + chunk_size]
+        return
+
+    if isinstance(source, (pa.Table, pa.RecordBatch)):
+        if column not in source.schema.names:
+            raise missing_column(column, "Arrow table")
+        table = source if isinstance(source, pa.Table) else pa.Table.from_batches([source])
+        for batch in table.select([column]).to_batches(max_chunksize=chunk_size):
+            yield batch.column(0).to_pandas()
+        return
+
+    path = Path(source)
+    if not path.exists():
+        raise FileNotFoundError(f"Input file not found: {path}")
+    suffix = path.suffix.lower()
+
+    if suffix == ".parquet" or path.is_dir():
+        dataset = ds.dataset(path, format="parquet")
+        if column not in dataset.schema.names:
+            raise missing_column(column, path)
+        for batch in dataset.to_batches(columns=[column], batch_size=chunk_size):
+            yield batch.column(0).to_pandas()
+
+    elif suffix in CSV_SUFFIXES:
+        parse_options = pacsv.ParseOptions(delimiter="\t" if suffix == ".tsv" else ",")
+        # Read the ID column as text so 000123 / 70238.0 survive as written
+        convert_options = pacsv.ConvertOptions(include_columns=[column], column_types={column: pa.string()})
+        read_options = pacsv.ReadOptions(block_size=16 << 20)
+        try:
+            reader = pacsv.open_csv(path, read_options=read_options,
+                                    parse_options=parse_options, convert_options=convert_options)
+        except (pa.ArrowInvalid, KeyError) as e:
+            if column in str(e):
+                raise missing_column(column, path) from e
+            raise
+        for batch in reader:
+            series = batch.column(0).to_pandas()
+            for start in range(0, len(series), chunk_size):
+                yield series.iloc[start:start + chunk_size]
+
+    elif suffix in NDJSON_SUFFIXES:
+        with pd.read_json(path, lines=True, chunksize=chunk_size, dtype={column: str}) as reader:
+            for chunk in reader:
+                if column not in chunk.columns:
+                    raise missing_column(column, path)
+                yield chunk[column]
+
+    elif suffix in EXCEL_SUFFIXES:
+        df = pd.read_excel(path, usecols=lambda c: c == column)
+        if column not in df.columns:
+            raise missing_column(column, path)
+        yield from iter_bundle_id_chunks(df, column, chunk_size)
+
+    else:
+        raise ValueError(f"Unsupported input format: {path.suffix}")
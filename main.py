@@ -2,9 +2,14 @@
 import asyncio
 from pathlib import Path
 import pandas as pd
+import pyarrow as pa
 from loguru import logger
 from dataclasses import dataclass, field
 from validation import BundleValidator
+from orchestrator import StoreOrchestrator
+from freshness import FreshnessPolicy
+from combine import combine_outputs
+from permanent_store import PermanentStore
 from store_validator.apple_store import AppleStoreConfig
 from store_validator.amazon_store import AmazonStoreConfig
 from store_validator.microsft_store import MicrosoftManager
@@ -15,6 +20,7 @@ from store_validator.Samsung_app_store import Samsung_app_store_Manager
 from store_validator.zeasn import ZeasnManager
 from store_validator.android_store import appstoreManager
 from store_validator.vizio import VizioManager
+from store_validator.routed_ids import count_routed_ids
 import sys
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
@@ -32,8 +38,11 @@ class DirectoryConfig:
     store_logs_dir: Path = Path("store_logs")
     output_dir: Path = Path("output")
     routed_dir: Path = Path("routed_ids")
-    permanent_file: Path = Path("output/combined_permanent.parquet")
+    permanent_store: PermanentStore = field(default_factory=PermanentStore)
+    changes_dir: Path = Path("output/changes")
     temp_file: Path = Path("output/combined_temp.parquet")
+    orchestrator: StoreOrchestrator = field(default_factory=StoreOrchestrator)
+    freshness: FreshnessPolicy = field(default_factory=FreshnessPolicy)
 
     
     def __post_init__(self):
@@ -42,6 +51,7 @@ class DirectoryConfig:
         self.store_logs_dir.mkdir(exist_ok=True)
         self.output_dir.mkdir(exist_ok=True)
         self.routed_dir.mkdir(exist_ok=True)
+        self.freshness.permanent = self.permanent_store
 
     def setup_logger(self):
         logger.remove()
@@ -59,95 +69,21 @@ class DirectoryConfig:
         logger.add(sys.stdout, level="INFO")
         logger.info(f"Logging started in file: {self.log_file}")
 
-    def load_existing_developer_urls(self) -> dict:  # FIXED: Removed staticmethod, fixed indentation
-        """Load existing bundle_id to developer_url mappings from merge file"""
-        if self.permanent_file.exists():
-            try:
-                existing_df = pd.read_parquet(self.permanent_file)
-                if not existing_df.empty and 'bundle_id' in existing_df.columns and 'developer_url' in existing_df.columns:
-                    url_mapping = existing_df.set_index('bundle_id')['developer_url'].to_dict()
-                    print(f"Loaded {len(url_mapping)} existing developer URLs from merge file")
-                    logger.info(f"Loaded {len(url_mapping)} existing developer URLs from merge file")
-                    return url_mapping
-            except Exception as e:
-                logger.error(f"Error reading existing merge file: {e}")
-                print(f"Error reading existing merge file: {e}")
-        
-        print("No existing merge file found or empty, starting fresh")
-        return {}
-
-    def merge_outputs(self, merged_output_file: Path):
-        """Merge all output parquet files into one combined file"""
-        # FIXED: Removed incorrect parameter
-        existing_urls = self.load_existing_developer_urls()
-        
-        result_frames = []
-        files = list(self.output_dir.glob("*.parquet"))
-        logger.info(f"Found Parquet files: {[f.name for f in files]}")
-
-        for file in files:
-            if file.name == merged_output_file.name:
-                continue 
-            try:
-                df = pd.read_parquet(file)
-                
-                if df.empty:
-                    continue
-                    
-                if 'bundle_id' not in df.columns:
-                    continue
-                    
-                if 'developer_url' not in df.columns:
-                    df['developer_url'] = ''
-                
-                # FIXED: Use the method correctly
-                df['developer_url'] = df.apply(lambda row: self.get_developer_url(row, existing_urls), axis=1)
-                
-                df = df[['bundle_id', 'developer_url']]
-                df["source_store"] = file.stem
-                result_frames.append(df)
-                
-            except Exception as e:
-                logger.error(f"Error reading {file}: {e}")
-
-        if result_frames:
-            combined = pd.concat(result_frames, ignore_index=True)
-            
-            if 'bundle_id' not in combined.columns:
-                combined['bundle_id'] = ''
-            if 'developer_url' not in combined.columns:
-                combined['developer_url'] = ''
-            
-            combined = combined[['bundle_id', 'developer_url', 'source_store']]
-            combined = combined.drop_duplicates(subset=['bundle_id'], keep='last')
-            
-            combined.to_parquet(merged_output_file, index=False)
-            logger.success(f"Merged output saved to: {merged_output_file}")
-            print(f"Final merged file contains {len(combined)} unique bundle IDs")
-        else:
-            logger.warning("No parquet files found for merging.")
-            if not merged_output_file.exists():
-                empty_df = pd.DataFrame(columns=['bundle_id', 'developer_url', 'source_store'])
-                empty_df.to_parquet(merged_output_file, index=False)
-                print("Created empty merged file with required columns")
-
-    def get_developer_url(self, row, existing_urls):  # ADDED: Missing method
-        """Helper method for merge_outputs"""
-        bundle_id = row['bundle_id']
-        new_url = row['developer_url']
-        if bundle_id in existing_urls and existing_urls[bundle_id]:
-            return existing_urls[bundle_id]
-        return new_url
-    
+    def merge_outputs(self):
+        """Merge all output parquet files into the temp file and upsert the changes into the permanent store"""
+        # Still-fresh IDs were never fetched; their stored rows keep the temp file complete
+        combined, upserted, changes = combine_outputs(self.output_dir, self.temp_file, self.permanent_store,
+                                                      self.changes_dir, self.freshness.skipped_ids)
+        print(f"Merged {len(combined)} bundle IDs from this run; "
+              f"{upserted} rows saved to {self.permanent_store.root}, "
+              f"{changes} developer URL changes written to {self.changes_dir}")
 
     async def validate_and_route_ids(self, df_or_path) -> Path:
-        """Validate and route bundle IDs from Excel file or DataFrame"""
-        validator = BundleValidator()
+        """Validate and route bundle IDs from a file, DataFrame or Arrow table"""
+        validator = BundleValidator(freshness=self.freshness)
         
-        # If input is path, let validator handle it
-        if isinstance(df_or_path, (str, Path)):
-            routed_dir = await validator.validate_and_route_ids(df_or_path)
-        elif isinstance(df_or_path, pd.DataFrame):
+        # Paths (xlsx/csv/parquet/ndjson), DataFrames and Arrow tables are all accepted
+        if isinstance(df_or_path, (str, Path, pd.DataFrame, pa.Table)):
             routed_dir = await validator.validate_and_route_ids(df_or_path)
         else:
             raise ValueError(f"Invalid input type: {type(df_or_path)}")
@@ -162,26 +98,15 @@ class DirectoryConfig:
         print("Starting bundle ID validation and routing...")
         logger.info("Starting bundle ID validation and routing")
 
-        store_files = ["apple", "android", "amazon", "microsoft", "gallaxy",
-                   "samsung", "zeasn", "vizio", "roku", "lg"]
-
-        for store_name in store_files:
-            store_file = self.routed_dir / f"{store_name}.parquet"
-            if store_file.exists():
-                try:
-                    store_file.unlink()
-                    logger.info(f"Deleted old routed file: {store_file}")
-                except Exception as e:
-                    logger.error(f"Failed to delete {store_file}: {e}")
-        
+        # Old routed partitions are cleared by the validator's dataset writer
         # FIXED: Corrected method call
         from pathlib import Path
         excel_file = Path("test.xlsx")
         if not excel_file.exists():
             raise FileNotFoundError(f"Input Excel file not found: {excel_file}")
 
-        # Use BundleValidator directly with Excel file path
-        validator = BundleValidator()
+        # Use BundleValidator directly with Excel file path; IDs resolved within their TTL are skipped
+        validator = BundleValidator(freshness=self.freshness)
         self.routed_dir = await validator.validate_and_route_ids(excel_file)
         print(f"Routing completed. Files saved to: {self.routed_dir}")
         logger.info(f"Routing completed. Files saved to: {self.routed_dir}")
@@ -202,38 +127,32 @@ class DirectoryConfig:
 
         print("\nProcessing each app store:")
         logger.info("Starting store processing")
-        
-        for store_name, processor in store_processors.items():
-            store_file = self.routed_dir / f"{store_name}.parquet"
-            
-            if store_file.exists():
-                df = pd.read_parquet(store_file)
-                if not df.empty:
-                    print(f"    {store_name.upper():<15} - {len(df)} bundle IDs")
-                    logger.info(f"Processing {store_name} with {len(df)} IDs")
-                    
-                    try:
-                        await processor.process(store_file)
-                        print(f"       Successfully processed {store_name}")
-                        
-                    except Exception as e:
-                        error_msg = f"Error processing {store_name}: {e}"
-                        print(f"       {error_msg}")
-                        logger.error(error_msg)
-                else:
-                    print(f"    {store_name.upper():<15} - No bundle IDs")
-                    logger.info(f"{store_name} has no bundle IDs to process")
+
+        # Counts come from parquet footers; empty stores are never opened
+        routed_counts = count_routed_ids(self.routed_dir)
+        for store_name in store_processors:
+            n_ids = routed_counts.get(store_name, 0)
+            print(f"    {store_name.upper():<15} - {n_ids or 'No'} bundle IDs")
+
+        # Freshness has been read, so the permanent store can be compacted while the stores are fetched
+        compaction = asyncio.create_task(self.permanent_store.compact_in_background())
+
+        # All stores run at once; each scans only its own store=<name> partition
+        results = await self.orchestrator.run(store_processors, self.routed_dir, routed_counts)
+        for store_name, result in results.items():
+            if result["status"] == "ok":
+                print(f"       Successfully processed {store_name} in {result['seconds']}s")
             else:
-                print(f"    {store_name.upper():<15} - File not found")
-                logger.warning(f"{store_name} file not found at {store_file}")
+                print(f"       Error processing {store_name}: {result['error']}")
         
         # print(f"LG file exists: {(self.routed_dir / 'lg.parquet').exists()}")
         # print(f"Roku file exists: {(self.routed_dir / 'roku.parquet').exists()}")
         
         print("\nMerging all outputs...")
         logger.info("Merging all outputs")
-        self.merge_outputs(merged_output_file=self.temp_file)      
-        self.merge_outputs(merged_output_file=self.permanent_file)  
+        await compaction
+        # One scan of output/; only this run's changes are written to the permanent store
+        self.merge_outputs()
         print("All processing completed successfully!")
         logger.success("All processing completed successfully")
 
@@ -0,0 +1,112 @@
+# orchestrator.py
+import time
+import asyncio
+from asyncio import Semaphore
+from pathlib import Path
+from loguru import logger
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+from routing_engine import LOCAL_STORES
+from store_validator.limits import StoreBudget
+from store_validator.loop_lag import LoopLagMonitor
+
+
+@dataclass
+class StoreOrchestrator:
+    """Runs every store processor at once under a global connection budget.
+
+    Network stores share ``global_limit`` in-flight requests, each capped by its
+    own limit (adaptive when the manager has one, with ``store_limits`` as its
+    ceiling); local catalog stores run in worker threads so their pandas work
+    does not block the event loop. A failing store never stops the others.
+    """
+    global_limit: int = 20
+    store_limits: Dict[str, int] = field(default_factory=dict)
+    mode: str = "concurrent"  # or "sequential"
+
+    def __post_init__(self):
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.loop_lag = LoopLagMonitor()
+
+    def attach_budget(self, store_name: str, processor, global_semaphore: Semaphore):
+        """Swap the processor's own semaphore for one that also counts against the global budget."""
+        if store_name in LOCAL_STORES or not hasattr(processor, "semaphore"):
+            return
+        concurrency = getattr(processor, "concurrency", None)
+        if concurrency is not None:
+            if store_name in self.store_limits:
+                concurrency.max_limit = self.store_limits[store_name]
+                concurrency.set_limit(min(concurrency.limit, concurrency.max_limit), "cap")
+            processor.semaphore = StoreBudget(concurrency, global_semaphore)
+            # A second endpoint's limiter (Apple's page stage) draws on the same global budget
+            html_concurrency = getattr(processor, "html_concurrency", None)
+            if html_concurrency is not None:
+                processor.html_semaphore = StoreBudget(html_concurrency, global_semaphore)
+            return
+        limit = self.store_limits.get(store_name, getattr(processor, "semaphore_limit", 5))
+        processor.semaphore = StoreBudget(limit, global_semaphore)
+
+    async def run_store(self, store_name: str, processor, input_path: Path):
+        start = time.perf_counter()
+        status, error = "ok", None
+        try:
+            if store_name in LOCAL_STORES:
+                await asyncio.to_thread(asyncio.run, processor.process(input_path))
+            else:
+                await processor.process(input_path)
+        except Exception as e:
+            status, error = "failed", str(e)
+            logger.error(f"Error processing {store_name}: {e}")
+        finally:
+            # Keep what was fetched so a rerun resumes instead of starting over
+            journal = getattr(processor, "journal", None)
+            if journal is not None:
+                journal.close()
+        elapsed = time.perf_counter() - start
+        self.results[store_name] = {"status": status, "seconds": round(elapsed, 2), "error": error}
+        concurrency = getattr(processor, "concurrency", None)
+        if concurrency is not None:
+            concurrency.log_trajectory()
+            self.results[store_name]["concurrency"] = concurrency.summary()
+        html_concurrency = getattr(processor, "html_concurrency", None)
+        if html_concurrency is not None:
+            html_concurrency.log_trajectory()
+            self.results[store_name]["html_concurrency"] = html_concurrency.summary()
+        stats = getattr(processor, "stats", None)
+        if stats:
+            self.results[store_name]["stats"] = dict(stats)
+        logger.info(f"{store_name} finished in {elapsed:.2f}s ({status})")
+
+    async def run(self, store_processors: Dict[str, Any], input_path: Path,
+                  routed_counts: Optional[Dict[str, int]] = None) -> Dict[str, Dict[str, Any]]:
+        """Process every store that has routed IDs; returns per-store status and timings."""
+        self.results = {}
+        global_semaphore = Semaphore(self.global_limit)
+        active = {
+            name: proc for name, proc in store_processors.items()
+            if routed_counts is None or routed_counts.get(name, 0)
+        }
+        for name in store_processors.keys() - active.keys():
+            logger.info(f"{name} has no bundle IDs to process")
+
+        start = time.perf_counter()
+        # Lag here means something (usually inline parsing) is stalling every in-flight request
+        self.loop_lag.start()
+        if self.mode == "sequential":
+            for name, proc in active.items():
+                await self.run_store(name, proc, input_path)
+        else:
+            for name, proc in active.items():
+                self.attach_budget(name, proc, global_semaphore)
+            await asyncio.gather(*(self.run_store(name, proc, input_path) for name, proc in active.items()))
+        wall = time.perf_counter() - start
+        await self.loop_lag.stop()
+        self.loop_lag.log("Store processing event loop")
+
+        sequential = sum(r["seconds"] for r in self.results.values())
+        failed = [name for name, r in self.results.items() if r["status"] != "ok"]
+        print(f"\nStore processing finished in {wall:.1f}s ({self.mode}); "
+              f"sequential would take ~{sequential:.1f}s, saved ~{max(sequential - wall, 0):.1f}s")
+        logger.info(f"Store wall-clock {wall:.2f}s vs sequential sum {sequential:.2f}s "
+                    f"(saved {max(sequential - wall, 0):.2f}s); failed stores: {failed or 'none'}")
+        return self.results
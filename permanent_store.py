@@ -0,0 +1,177 @@
+# permanent_store.py
+import os
+import uuid
+import shutil
+import asyncio
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from pathlib import Path
+from loguru import logger
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+from store_validator.parquet_sink import FETCHED_AT, read_output
+
+PERMANENT_COLUMNS = ["bundle_id", "developer_url", "source_store", "fetched_at"]
+PARTITIONING = ds.partitioning(pa.schema([("source_store", pa.string()), ("run_date", pa.string())]),
+                               flavor="hive")
+PERMANENT_SCHEMA = pa.schema([("bundle_id", pa.string()), ("developer_url", pa.string()),
+                              ("fetched_at", FETCHED_AT), ("source_store", pa.string()),
+                              ("run_date", pa.string())])
+
+
+def file_timestamp(path: Path) -> pd.Timestamp:
+    """Modification time of a file as a UTC timestamp."""
+    return pd.Timestamp(Path(path).stat().st_mtime, unit="s", tz="UTC")
+
+
+def stamp_fetched_at(df: pd.DataFrame, source_file: Path) -> pd.DataFrame:
+    """Ensure a UTC ``fetched_at`` column; rows without one are dated by the file's mtime."""
+    stamp = file_timestamp(source_file)
+    if "fetched_at" not in df.columns:
+        df["fetched_at"] = stamp
+    else:
+        df["fetched_at"] = pd.to_datetime(df["fetched_at"], utc=True).fillna(stamp).astype("datetime64[ns, UTC]")
+    return df
+
+
+def empty_rows() -> pd.DataFrame:
+    return PERMANENT_SCHEMA.empty_table().select(PERMANENT_COLUMNS).to_pandas()
+
+
+@dataclass
+class PermanentStore:
+    """Every resolved developer_url, kept as an append-only partitioned dataset.
+
+    Layout: root/source_store=<store>/run_date=<YYYY-MM-DD>/*.parquet, where
+    run_date is the day the file was written. A run appends only the rows it
+    changed (``upsert``) and readers take the newest ``fetched_at`` per
+    bundle_id, so history is never rewritten on the hot path. ``compact``
+    folds the segments (and the single-file ``legacy_file`` this replaced)
+    into one file per store holding only the latest rows.
+    """
+    root: Path = Path("output/combined_permanent")
+    legacy_file: Path = Path("output/combined_permanent.parquet")
+    compact_after: int = 32  # segment files before compaction is worth it
+
+    def segments(self) -> List[Path]:
+        """Committed segment files; ``_staging-*`` directories are still being written."""
+        if not self.root.exists():
+            return []
+        return sorted(path for path in self.root.rglob("*.parquet")
+                      if not any(part.startswith("_") for part in path.relative_to(self.root).parts))
+
+    # -- reads ----------------------------------------------------------------
+
+    def read_legacy(self, wanted: Optional[pa.Array] = None) -> pd.DataFrame:
+        if not self.legacy_file.exists():
+            return empty_rows()
+        df = read_output(self.legacy_file, PERMANENT_COLUMNS)
+        if df.empty or not {"bundle_id", "developer_url"} <= set(df.columns):
+            return empty_rows()
+        if wanted is not None:
+            df = df[df["bundle_id"].isin(wanted.to_pandas())].copy()
+        if "source_store" not in df.columns:
+            df["source_store"] = ""
+        return stamp_fetched_at(df, self.legacy_file)[PERMANENT_COLUMNS]
+
+    def read(self, bundle_ids: Optional[Iterable[str]] = None,
+             segments: Optional[List[Path]] = None) -> pd.DataFrame:
+        """Every stored version of each row, legacy rows first; only ``bundle_ids`` if given."""
+        segments = self.segments() if segments is None else segments
+        wanted = None if bundle_ids is None else pa.array(list(bundle_ids), pa.string())
+        frames = [self.read_legacy(wanted)]
+        if segments:
+            dataset = ds.dataset([str(path) for path in segments], format="parquet", schema=PERMANENT_SCHEMA,
+                                 partitioning=PARTITIONING, partition_base_dir=str(self.root))
+            condition = None
+            # isin only pays off when the run touches a small share of the store (counts come from footers)
+            if wanted is not None and len(wanted) * 4 < dataset.count_rows():
+                condition = ds.field("bundle_id").isin(wanted)
+            frames.append(dataset.to_table(columns=PERMANENT_COLUMNS, filter=condition,
+                                           use_threads=True).to_pandas())
+        frames = [frame for frame in frames if not frame.empty]
+        if not frames:
+            return empty_rows()
+        return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+    def latest(self, bundle_ids: Optional[Iterable[str]] = None,
+               segments: Optional[List[Path]] = None) -> pd.DataFrame:
+        """The current version of each bundle_id: its newest ``fetched_at``."""
+        rows = self.read(bundle_ids, segments)
+        return (rows.sort_values("fetched_at", kind="stable")
+                    .drop_duplicates("bundle_id", keep="last")
+                    .reset_index(drop=True))
+
+    def resolved(self, bundle_ids: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """bundle_id -> (developer_url, fetched_at), as ``prefer_fresher`` and the freshness check use it."""
+        return self.latest(bundle_ids).set_index("bundle_id")[["developer_url", "fetched_at"]]
+
+    # -- writes ---------------------------------------------------------------
+
+    def write(self, rows: pd.DataFrame, prefix: str) -> List[Path]:
+        """Write rows into today's partitions; each file only appears once it is complete."""
+        now = pd.Timestamp.now(tz="UTC")
+        table = pa.Table.from_pandas(
+            rows[PERMANENT_COLUMNS].assign(source_store=rows["source_store"].fillna("").astype(str),
+                                           run_date=f"{now:%Y-%m-%d}"),
+            schema=PERMANENT_SCHEMA, preserve_index=False)
+        name = f"{prefix}-{now:%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        staging = self.root / f"_staging-{name}"
+        ds.write_dataset(table, staging, format="parquet", partitioning=PARTITIONING,
+                         basename_template=f"{name}-{{i}}.parquet")
+        written = []
+        for part in sorted(staging.rglob("*.parquet")):
+            target = self.root / part.relative_to(staging)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(part, target)
+            written.append(target)
+        shutil.rmtree(staging, ignore_errors=True)
+        return written
+
+    def upsert(self, rows: pd.DataFrame) -> int:
+        """Append new versions of ``rows``; they supersede older ones by ``fetched_at``."""
+        if rows.empty:
+            return 0
+        files = self.write(rows, "part")
+        logger.info(f"Permanent store: upserted {len(rows)} rows into {len(files)} segment(s) under {self.root}")
+        return len(rows)
+
+    # -- compaction -----------------------------------------------------------
+
+    def needs_compaction(self) -> bool:
+        return self.legacy_file.exists() or len(self.segments()) >= self.compact_after
+
+    def compact(self) -> int:
+        """Rewrite the store as one file per store holding only the latest row per bundle_id.
+
+        The new files are moved into place before the old ones are removed, so
+        an interrupted compaction leaves duplicate versions, which reads
+        already resolve, never missing ones. Returns the rows kept.
+        """
+        for stale in self.root.glob("_staging-*"):
+            shutil.rmtree(stale, ignore_errors=True)
+        if not self.needs_compaction():
+            return 0
+        segments = self.segments()
+        latest = self.latest(segments=segments)
+        if not latest.empty:
+            self.write(latest, "compacted")
+        for path in segments:
+            path.unlink()
+        for directory in sorted(self.root.glob("*/*"), reverse=True) + sorted(self.root.glob("*")):
+            if directory.is_dir() and not any(directory.iterdir()):
+                directory.rmdir()
+        if self.legacy_file.exists():
+            self.legacy_file.unlink()
+            logger.info(f"Permanent store: migrated {self.legacy_file} into {self.root}")
+        logger.info(f"Permanent store: compacted {len(segments)} segment(s) into {len(latest)} rows")
+        return len(latest)
+
+    async def compact_in_background(self) -> int:
+        """``compact`` on a worker thread; a failure is logged and leaves the segments readable."""
+        try:
+            return await asyncio.to_thread(self.compact)
+        except Exception as e:
+            logger.error(f"Permanent store: compaction of {self.root} failed: {e}")
+            return 0
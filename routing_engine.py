@@ -0,0 +1,178 @@
+# routing_engine.py
+import os
+import pandas as pd
+from pathlib import Path
+from loguru import logger
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+# Stores resolved from files on disk; everything else costs a network fetch
+LOCAL_STORES = ("lg", "roku", "vizio")
+
+# Where the local catalogs live; LOCAL_CATALOG_DIR overrides the in-repo copy
+CATALOG_DIR = Path(os.getenv("LOCAL_CATALOG_DIR", Path(__file__).resolve().parent / "store_validator"))
+
+# How much a bare pattern match says about the store (0..1)
+BASE_CONFIDENCE: Dict[str, float] = {
+    "samsung": 0.95,
+    "vizio": 0.95,
+    "playstation": 0.95,
+    "microsoft": 0.9,
+    "amazon": 0.9,
+    "android": 0.7,
+    "zeasn": 0.6,
+    "gallaxy": 0.5,
+    "apple": 0.3,
+    "roku": 0.2,
+    "lg": 0.2,
+}
+
+# Stores also fetched when the key store wins, because IDs it cannot resolve are
+# only found there (Galaxy-only apps share Android's bare package names)
+SECONDARY_STORES: Dict[str, List[str]] = {
+    "android": ["gallaxy"],
+}
+
+# Shapes that make a store much more likely than its base pattern suggests.
+# All-digit IDs must outrank Microsoft: its pattern also accepts 9xxxxxxxx,
+# but real Microsoft product IDs always contain letters.
+CONFIDENCE_BOOSTS: Dict[str, List[Tuple[str, float]]] = {
+    "apple": [(r"^id\d{6,}$", 0.95), (r"^\d{9,10}$", 0.92)],
+}
+
+
+@dataclass
+class LocalCatalogs:
+    """ID sets of the local store catalogs (LG CSV, Roku CSVs, Vizio parquet).
+
+    Paths default to ``CATALOG_DIR``; pass them explicitly to use other copies.
+    """
+    lg_file: Path = CATALOG_DIR / "LG_store" / "lg_all_apps_with_developer_urls_async.csv"
+    roku_files: List[Path] = field(default_factory=lambda: [
+        CATALOG_DIR / "roku_store" / "roku_store_searching_apps.csv",
+        CATALOG_DIR / "roku_store" / "roku_app_data_updated.csv",
+    ])
+    vizio_file: Path = CATALOG_DIR / "vizio_store" / "philips_vizio_appstoday.parquet"
+
+    def __post_init__(self):
+        self.ids: Dict[str, Optional[Set[str]]] = {
+            "lg": self.load_ids([self.lg_file], ["appId"], reader=pd.read_csv),
+            "roku": self.load_ids(self.roku_files, ["appstore_bundle_id"], reader=pd.read_csv),
+            "vizio": self.load_ids([self.vizio_file], ["data-app-id", "data-bundle-id"], reader=pd.read_parquet),
+        }
+        for store, ids in self.ids.items():
+            if ids is None:
+                logger.warning(f"No {store} catalog available: {store} IDs are routed without a local check")
+
+    @staticmethod
+    def load_ids(files: List[Path], columns: List[str], reader) -> Optional[Set[str]]:
+        """Union of the given ID columns; None when no catalog file is available."""
+        found = None
+        for file in files:
+            file = Path(file)
+            if not file.exists():
+                logger.warning(f"Local catalog not found, cannot pre-check: {file}")
+                continue
+            try:
+                df = reader(file)
+            except Exception as e:
+                logger.error(f"Error reading local catalog {file}: {e}")
+                continue
+            found = found if found is not None else set()
+            for col in columns:
+                if col in df.columns:
+                    ids = df[col].dropna().astype(str).str.strip().str.replace(r"\.0$", "", regex=True)
+                    found.update(ids)
+        return found
+
+    def contains(self, store: str, bundle_ids: pd.Series) -> Optional[pd.Series]:
+        """Vectorized membership; None when the store's catalog is unavailable."""
+        ids = self.ids.get(store)
+        if ids is None:
+            return None
+        return bundle_ids.astype(str).isin(ids)
+
+
+@dataclass
+class RoutingEngine:
+    """Chooses which candidate stores an ID is actually sent to.
+
+    Local catalogs are checked first; a local hit is final. Otherwise the
+    ``max_network_stores`` highest-confidence network stores win (stores tied
+    on the cut-off score all win) and the rest are dropped, except the
+    winners' ``secondary_stores``, which are kept as well.
+    """
+    catalogs: Optional[LocalCatalogs] = None
+    base_confidence: Dict[str, float] = field(default_factory=lambda: dict(BASE_CONFIDENCE))
+    confidence_boosts: Dict[str, List[Tuple[str, float]]] = field(default_factory=lambda: dict(CONFIDENCE_BOOSTS))
+    max_network_stores: int = 1
+    secondary_stores: Dict[str, List[str]] = field(default_factory=lambda: dict(SECONDARY_STORES))
+
+    def __post_init__(self):
+        if self.catalogs is None:
+            self.catalogs = LocalCatalogs()
+        self.last_stats: Dict[str, int] = {}
+
+    def score(self, candidates: pd.DataFrame) -> pd.Series:
+        """Confidence of every (bundle_id, store) candidate row."""
+        scores = candidates["store"].map(self.base_confidence).fillna(0.1).astype(float)
+        for store, boosts in self.confidence_boosts.items():
+            rows = candidates["store"] == store
+            if not rows.any():
+                continue
+            ids = candidates.loc[rows, "bundle_id"].astype(str)
+            for pattern, boost in boosts:
+                hit = ids.str.contains(pattern, case=False, regex=True)
+                scores.loc[hit[hit].index] = scores.loc[hit[hit].index].clip(lower=boost)
+        return scores
+
+    def decide(self, candidates: pd.DataFrame) -> pd.DataFrame:
+        """Return the candidates with confidence, local-hit and selected columns."""
+        df = candidates[["bundle_id", "store"]].drop_duplicates().reset_index(drop=True)
+        df["confidence"] = self.score(df)
+        df["is_local"] = df["store"].isin(LOCAL_STORES)
+        df["local_hit"] = False
+        df["local_miss"] = False
+
+        # Cheap local lookups settle an ID before any network store is considered
+        for store in LOCAL_STORES:
+            rows = df["store"] == store
+            if not rows.any():
+                continue
+            hit = self.catalogs.contains(store, df.loc[rows, "bundle_id"])
+            if hit is None:
+                continue
+            df.loc[hit.index, "local_hit"] = hit
+            df.loc[hit.index, "local_miss"] = ~hit
+        df.loc[df["local_hit"], "confidence"] = 1.0
+
+        resolved_locally = set(df.loc[df["local_hit"], "bundle_id"])
+        network = df[~df["is_local"] & ~df["bundle_id"].isin(resolved_locally)]
+        # Ties share a rank, so an equally likely store is never dropped on order alone
+        rank = network.groupby("bundle_id")["confidence"].rank(method="min", ascending=False)
+        winners = rank.index[rank <= self.max_network_stores]
+
+        # Local stores whose catalog is missing are kept so their manager still runs
+        unknown_local = df["is_local"] & ~df["local_hit"] & ~df["local_miss"]
+        df["selected"] = df["local_hit"] | unknown_local
+        df.loc[winners, "selected"] = True
+        secondary = pd.Series(False, index=df.index)
+        won = df.loc[winners]
+        for store, extras in self.secondary_stores.items():
+            won_ids = won.loc[won["store"] == store, "bundle_id"]
+            rows = network.index[network["store"].isin(extras) & network["bundle_id"].isin(won_ids)]
+            secondary.loc[rows] = ~df.loc[rows, "selected"]
+            df.loc[rows, "selected"] = True
+
+        network_candidates = int((~df["is_local"]).sum())
+        network_selected = int((~df["is_local"] & df["selected"]).sum())
+        self.last_stats = {
+            "candidates": len(df),
+            "selected": int(df["selected"].sum()),
+            "local_hits": int(df["local_hit"].sum()),
+            "local_misses": int(df["local_miss"].sum()),
+            "network_selected": network_selected,
+            "secondary_selected": int(secondary.sum()),
+            "redundant_fetches_avoided": network_candidates - network_selected,
+        }
+        return df
@@ -2,27 +2,56 @@
 import asyncio
 from pathlib import Path
 from curl_cffi.requests import AsyncSession
-from asyncio import Semaphore
-import pandas as pd
-from lxml import html
+import pyarrow as pa
 from typing import Dict, Optional, List
 from loguru import logger
 from dataclasses import dataclass, field
 import sys
+from store_validator.rate_limiter import HostRateLimiter, host_limiter
+from store_validator.adaptive import AdaptiveConcurrency
+from store_validator.checkpoint import CheckpointJournal, CHECKPOINT_DIR
+from store_validator.worker_pool import WorkerPool, crawl_store
+from store_validator.parse_pool import ParsePool, parse_pool
+from store_validator.parquet_sink import ParquetSink, output_schema
+from store_validator.head_fetch import HeadResponse, get_page
+from store_validator.extractor import ExtractRules, MetaExtractor
+
+SAMSUNG_RULES = ExtractRules(meta={
+    "app_store_id": "appstore:store_id",
+    "appstore_bundle_id": "appstore:bundle_id",
+    "appstore_developer_url": "appstore:developer_url",
+}, default="")
+samsung_extractor = MetaExtractor(SAMSUNG_RULES)
+SAMSUNG_SCHEMA = output_schema([*SAMSUNG_RULES.meta, "url", "bundle_id", "status_code"],
+                               types={"status_code": pa.int16()}, dictionary=["appstore_developer_url"])
+
 
 @dataclass
 class Samsung_app_store_Manager:
     semaphore_limit: int = 5
-    batch_size: int = 100
+    max_concurrency: int = 32
+    queue_size: int = 1000
+    read_batch_size: int = 10_000
+    batch_size: int = 1000  # rows handed to the output writer thread at a time
+    rate_limiter: HostRateLimiter = field(default_factory=lambda: host_limiter)
+    parser: ParsePool = field(default_factory=lambda: parse_pool)
+    # Only <head> meta tags are needed, so the rest of the page is never downloaded
+    head_only: bool = True
+    head_fields: Dict[str, str] = field(default_factory=lambda: dict(SAMSUNG_RULES.meta))
+    retry_backoff: float = 2.0
+    checkpoint_dir: Path = CHECKPOINT_DIR
     output_dir: Path = Path("output")
     log_dir: Path = Path("logs/samsung_app_store.log")
     output_file: Path = Path("output/samsung.parquet")
     lookup_url: str = "https://www.samsung.com/us/appstore/app/{bundle_id}/"
 
     def __post_init__(self):
-        self.semaphore = Semaphore(self.semaphore_limit)
-        self.output_data_list = []
-        self.failure_data_list = []
+        self.concurrency = AdaptiveConcurrency("samsung", initial=self.semaphore_limit,
+                                               max_limit=self.max_concurrency)
+        self.semaphore = self.concurrency
+        self.journal = CheckpointJournal("samsung", self.checkpoint_dir)
+        self.pool = WorkerPool("samsung", workers=self.max_concurrency, queue_size=self.queue_size)
+        self.output = ParquetSink(self.output_file, self.batch_size, schema=SAMSUNG_SCHEMA)
 
     # def setup_logger(self):
     #     logger.remove()
@@ -40,90 +69,60 @@ class Samsung_app_store_Manager:
     #     logger.add(sys.stdout, level="INFO")
     #     logger.info(f"Logging started in file: {self.log_dir}")
 
-    def extract_app_id(self, content: str) -> Dict[str, Optional[str]]:
+    @staticmethod
+    def extract_app_id(content: str) -> Dict[str, Optional[str]]:
         if not content:
             return {}
-            
-        tree = html.fromstring(content)
-
-        def get_meta_content(name: str) -> Optional[str]:
-            result = tree.xpath(f'//meta[@name="{name}"]/@content')
-            return result[0] if result else ""
-
-        return {
-            "app_store_id": get_meta_content("appstore:store_id") or "",
-            "appstore_bundle_id": get_meta_content("appstore:bundle_id") or "",
-            "appstore_developer_url": get_meta_content("appstore:developer_url") or "",
-        }
-
-    def write_to_parquet(self, data, file_path=None):
-        if file_path is None:
-            file_path = self.output_file
-            
-        if not data:
-            return
-            
-        df = pd.DataFrame(data)
-        file_path.parent.mkdir(parents=True, exist_ok=True)
-        df = df.astype("string[pyarrow]").fillna("")
+        return samsung_extractor.extract(content)
 
-        if not df.empty:
-            df.to_parquet(file_path, engine="pyarrow", index=False)
+    async def extract_meta(self, response) -> Dict[str, Optional[str]]:
+        """Meta tags from a head-only fetch, or the full page parsed in the parse pool."""
+        if isinstance(response, HeadResponse):
+            return response.fields(self.head_fields, default="")
+        return await self.parser.parse(self.extract_app_id, response.text)
 
     async def fetch_data(self, session: AsyncSession, bundle_id: str, retries: int = 3, timeout: int = 30):
         attempt = 0
         url = self.lookup_url.format(bundle_id=bundle_id)
         
         while attempt < retries:
+            await self.rate_limiter.wait(url)
             async with self.semaphore:
                 try:
-                    response = await session.get(url, timeout=timeout, impersonate="chrome", allow_redirects=True)
+                    response = await self.concurrency.timed(get_page(session, url, self.head_fields if self.head_only else None, timeout=timeout, impersonate="chrome", allow_redirects=True))
                     res_status_code = response.status_code
                     logger.info(f"[{res_status_code}] {url}")
                     response.raise_for_status()
 
-                    meta_data = self.extract_app_id(response.text)
+                    meta_data = await self.extract_meta(response)
                     meta_data.update({
                         "url": url,
                         "bundle_id": bundle_id,
                         "status_code": res_status_code,
                     })
 
-                    self.output_data_list.append(meta_data)
+                    self.journal.done(bundle_id, meta_data)
+                    self.output.append(meta_data)
                     return
 
                 except Exception as e:
                     logger.error(f"Retry {attempt + 1} failed for {url}: {e}")
                     attempt += 1
                     if attempt == retries:
-                        self.output_data_list.append({
+                        failure_result = {
                             "url": url, 
                             "bundle_id": bundle_id, 
                             "status_code": "N/A",
                             "app_store_id": "",
                             "appstore_bundle_id": "",
                             "appstore_developer_url": ""
-                        })
-                    await asyncio.sleep(2)
+                        }
+                        self.journal.failed(bundle_id, failure_result)
+                        self.output.append(failure_result)
+            if attempt < retries:
+                # Back off outside the semaphore so the slot serves other IDs meanwhile
+                await asyncio.sleep(self.retry_backoff)
 
     async def process(self, input_path: Path):
         # self.setup_logger()
-        
-        Path("output").mkdir(exist_ok=True)
-        
-        if not input_path.exists():
-            logger.error(f"Input file not found: {input_path}")
-            return
-            
-        df = pd.read_parquet(input_path)
-        ids = df["bundle_id"].dropna().unique().tolist()
-        
-        logger.info(f"Processing {len(ids)} Samsung bundle IDs")
-        
-        async with AsyncSession(impersonate="chrome", allow_redirects=True) as session:
-            tasks = [self.fetch_data(session, bid) for bid in ids]
-            await asyncio.gather(*tasks)
-        
-        if self.output_data_list:
-            self.write_to_parquet(self.output_data_list)
-            logger.info(f"Saved {len(self.output_data_list)} Samsung results")
\ No newline at end of file
+        await crawl_store(self, "samsung", "Samsung", input_path, self.fetch_data)
@@ -0,0 +1,207 @@
+# adaptive.py
+import time
+import asyncio
+from collections import Counter, deque
+from email.utils import parsedate_to_datetime
+from loguru import logger
+from typing import Any, Awaitable, Optional, Sequence
+
+THROTTLE_STATUSES = (429, 503)
+MAX_PAUSE = 300.0
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After is either delta-seconds or an HTTP date; returns seconds to wait."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), MAX_PAUSE)
+
+
+class AdaptiveConcurrency:
+    """AIMD concurrency limit for one store; a drop-in for the manager's semaphore.
+
+    The limit grows while responses are healthy (doubling per window until the
+    first congestion signal, then +1 per window) and is cut multiplicatively on
+    429/503, captcha pages, errors or latency well above the best seen.
+    ``Retry-After`` pauses new requests for the store. Wrap each request with
+    ``timed()`` so the controller sees its status and latency.
+    """
+
+    def __init__(self, name: str, initial: int = 5, min_limit: int = 1, max_limit: int = 32,
+                 backoff: float = 0.5, error_backoff: float = 0.75, latency_tolerance: float = 2.0,
+                 block_markers: Sequence[str] = ()):
+        self.name = name
+        self.limit = float(max(min_limit, min(initial, max_limit)))
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.error_backoff = error_backoff
+        self.latency_tolerance = latency_tolerance
+        self.block_markers = [m.lower() for m in block_markers]
+
+        self.in_flight = 0
+        self.waiters: deque = deque()
+        self.paused_until = 0.0
+        self.slow_start = True
+        self.last_decrease = 0.0
+        self.baseline: Optional[float] = None
+        self.latency_ewma: Optional[float] = None
+        self.stats: Counter = Counter()
+        self.started = time.monotonic()
+        self.trajectory = [(0.0, self.current_limit, "start")]
+
+    @property
+    def current_limit(self) -> int:
+        return int(self.limit)
+
+    # -- semaphore interface ------------------------------------------------
+
+    async def acquire(self):
+        while True:
+            pause = self.paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+                continue
+            if not self.waiters and self.in_flight < self.current_limit:
+                self.in_flight += 1
+                return True
+            waiter = asyncio.get_running_loop().create_future()
+            self.waiters.append(waiter)
+            try:
+                await waiter
+                return True
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self.release()
+                elif waiter in self.waiters:
+                    self.waiters.remove(waiter)
+                raise
+
+    def release(self):
+        self.in_flight -= 1
+        self.wake()
+
+    def wake(self):
+        # Hand freed slots straight to the oldest waiters so newcomers cannot jump the queue
+        while self.waiters and self.in_flight < self.current_limit and time.monotonic() >= self.paused_until:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(True)
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+    # -- feedback -----------------------------------------------------------
+
+    async def timed(self, request: Awaitable[Any]) -> Any:
+        """Await a request and feed its outcome and latency to the controller."""
+        start = time.monotonic()
+        try:
+            response = await request
+        except Exception:
+            self.record_error(time.monotonic() - start)
+            raise
+        self.observe(response, time.monotonic() - start)
+        return response
+
+    def observe(self, response, latency: float):
+        status = getattr(response, "status_code", None)
+        if status in THROTTLE_STATUSES:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            self.stats[str(status)] += 1
+            self.decrease(self.backoff, f"{status}", retry_after)
+        elif self.block_markers and status == 200 and self.is_blocked(response):
+            self.stats["blocked"] += 1
+            self.decrease(self.backoff, "captcha")
+        elif status is not None and status >= 500:
+            self.stats["error"] += 1
+            self.decrease(self.error_backoff, f"{status}")
+        else:
+            # 2xx and ordinary 4xx (e.g. 404 for a delisted app) are healthy answers
+            self.stats["ok"] += 1
+            self.record_latency(latency)
+
+    def record_error(self, latency: float):
+        self.stats["error"] += 1
+        self.decrease(self.error_backoff, "error")
+
+    def is_blocked(self, response) -> bool:
+        text = (getattr(response, "text", "") or "")[:20000].lower()
+        return any(marker in text for marker in self.block_markers)
+
+    def record_latency(self, latency: float):
+        if self.baseline is None or latency < self.baseline:
+            self.baseline = latency
+        else:
+            # Let the baseline drift up slowly so one lucky fast response does not pin it
+            self.baseline += 0.01 * (latency - self.baseline)
+        self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+
+        if self.latency_ewma > self.baseline * self.latency_tolerance:
+            self.decrease(self.error_backoff, "latency")
+        else:
+            self.increase()
+
+    def increase(self):
+        if self.limit >= self.max_limit:
+            return
+        step = 1.0 if self.slow_start else 1.0 / self.limit
+        self.set_limit(min(self.max_limit, self.limit + step), "slow-start" if self.slow_start else "increase")
+
+    def decrease(self, factor: float, reason: str, retry_after: Optional[float] = None):
+        now = time.monotonic()
+        if retry_after:
+            self.paused_until = max(self.paused_until, now + retry_after)
+            asyncio.get_running_loop().call_later(retry_after, self.wake)
+            logger.warning(f"{self.name}: {reason}, pausing {retry_after:.1f}s (Retry-After)")
+        self.slow_start = False
+        # Responses already in flight report the same congestion; cut once per round trip
+        cooldown = max(self.latency_ewma or 0.0, 1.0)
+        if now - self.last_decrease < cooldown:
+            return
+        self.last_decrease = now
+        self.set_limit(max(self.min_limit, self.limit * factor), reason)
+
+    def set_limit(self, limit: float, reason: str):
+        before = self.current_limit
+        self.limit = limit
+        if self.current_limit != before:
+            self.trajectory.append((round(time.monotonic() - self.started, 2), self.current_limit, reason))
+            if self.current_limit > before:
+                self.wake()
+
+    # -- reporting ----------------------------------------------------------
+
+    def summary(self) -> dict:
+        limits = [limit for _, limit, _ in self.trajectory]
+        return {
+            "final_limit": self.current_limit,
+            "peak_limit": max(limits),
+            "changes": len(self.trajectory) - 1,
+            "responses": dict(self.stats),
+        }
+
+    def log_trajectory(self, max_points: int = 60):
+        summary = self.summary()
+        points = self.trajectory
+        if len(points) > max_points:
+            points = points[:max_points // 2] + points[-max_points // 2:]
+        path = " ".join(f"{limit}@{t}s" + (f"({reason})" if reason not in ("increase", "slow-start") else "")
+                        for t, limit, reason in points)
+        logger.info(f"{self.name} concurrency: final {summary['final_limit']}, peak {summary['peak_limit']}, "
+                    f"{summary['changes']} changes, responses {summary['responses']}")
+        logger.info(f"{self.name} concurrency trajectory: {path}")
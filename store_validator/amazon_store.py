@@ -3,21 +3,56 @@ import asyncio
 import os
 from pathlib import Path
 from curl_cffi.requests import AsyncSession
-from asyncio import Semaphore
-import pandas as pd  # FIXED: panadas → pandas
-from typing import Optional, List, Any, ClassVar, Dict
+import pyarrow as pa
+from typing import List, Any, ClassVar, Dict
 from dataclasses import dataclass, field
 from loguru import logger
-from lxml import html
 import sys
+from store_validator.rate_limiter import HostRateLimiter, host_limiter
+from store_validator.adaptive import AdaptiveConcurrency
+from store_validator.checkpoint import CheckpointJournal, CHECKPOINT_DIR
+from store_validator.worker_pool import WorkerPool, crawl_store
+from store_validator.parse_pool import ParsePool, parse_pool
+from store_validator.parquet_sink import ParquetSink, output_schema
+from store_validator.extractor import ExtractRules, MetaExtractor
+
+AMAZON_RULES = ExtractRules(
+    meta={
+        "appstore_store_id": "appstore:store_id",
+        "appstore_bundle_id": "appstore:bundle_id",
+        "appstore_developer_url": "appstore:developer_url",
+    },
+    links={
+        "developerWebsite": "Developer Website",
+        "appSupportUrl": "App Support",
+        "privacyPolicyUrl": "Privacy Policy",
+    },
+    default="",
+)
+amazon_extractor = MetaExtractor(AMAZON_RULES)
+AMAZON_SCHEMA = output_schema(
+    ["url", "bundle_id", "status_code", *AMAZON_RULES.meta, *AMAZON_RULES.links],
+    types={"status_code": pa.int16()},
+    dictionary=["appstore_developer_url", *AMAZON_RULES.links],
+)
+
 
 @dataclass
 class AmazonStoreConfig:
     semaphore_limit: int = 5  # FIXED: Semaphore_limit → semaphore_limit
-    batch_size: int = 100  # FIXED: batch_size → batch_size
+    max_concurrency: int = 8
+    queue_size: int = 1000
+    read_batch_size: int = 10_000
+    block_markers: List[str] = field(default_factory=lambda: ["validatecaptcha", "robot check"])
+    batch_size: int = 1000  # rows handed to the output writer thread at a time
+    rate_limiter: HostRateLimiter = field(default_factory=lambda: host_limiter)
+    parser: ParsePool = field(default_factory=lambda: parse_pool)
+    retry_backoff: float = 2.0
+    checkpoint_dir: Path = CHECKPOINT_DIR
     output_dir: Path = Path("output")
     log_dir: Path = Path("logs/amazon_app.log")
     output_file: Path = Path("output/amazon.parquet")
+    failure_file: Path = Path("failure_output/amazon_failure.parquet")
     
     # FIXED: Removed duplicate output_data_list declaration
     lookup_url: str = "https://www.amazon.com/dp/{bundle_id}/"
@@ -64,9 +99,13 @@ class AmazonStoreConfig:
     }
     
     def __post_init__(self):
-        self.semaphore = Semaphore(self.semaphore_limit)  # ADDED: Create semaphore instance
-        self.output_data_list = []  # INSTANCE variable, not ClassVar
-        self.failure_data_list = []
+        self.concurrency = AdaptiveConcurrency("amazon", initial=self.semaphore_limit,
+                                               max_limit=self.max_concurrency, block_markers=self.block_markers)
+        self.semaphore = self.concurrency
+        self.journal = CheckpointJournal("amazon", self.checkpoint_dir)
+        self.pool = WorkerPool("amazon", workers=self.max_concurrency, queue_size=self.queue_size)
+        self.output = ParquetSink(self.output_file, self.batch_size, schema=AMAZON_SCHEMA)
+        self.failures = ParquetSink(self.failure_file, self.batch_size)
 
     # def setup_logger(self):
     #     logger.remove()
@@ -91,30 +130,7 @@ class AmazonStoreConfig:
             return {}
             
         try:
-            tree = html.fromstring(content)
-            
-            def get_meta_content(name: str) -> Optional[str]:
-                results = tree.xpath(f'//meta[@name="{name}"]/@content')
-                return results[0] if results else ""
-            
-            meta_data = {
-                "appstore_store_id": get_meta_content("appstore:store_id") or "",
-                "appstore_bundle_id": get_meta_content("appstore:bundle_id") or "",
-                "appstore_developer_url": get_meta_content("appstore:developer_url") or "",
-            }
-
-            # Extract links with safe defaults
-            developer_website = tree.xpath('//a[contains(text(), "Developer Website")]/@href')
-            app_support = tree.xpath('//a[contains(text(), "App Support")]/@href')
-            privacy_policy = tree.xpath('//a[contains(text(), "Privacy Policy")]/@href')
-
-            meta_data.update({
-                "developerWebsite": developer_website[0] if developer_website else "",
-                "appSupportUrl": app_support[0] if app_support else "",
-                "privacyPolicyUrl": privacy_policy[0] if privacy_policy else "",
-            })
-
-            return meta_data
+            return amazon_extractor.extract(content)
         except Exception as e:
             logger.error(f"Error parsing Amazon content: {e}")
             return {
@@ -126,44 +142,31 @@ class AmazonStoreConfig:
                 "privacyPolicyUrl": ""
             }
 
-    def replace_to_parquet(self, data, append=False):
-        """Save data to parquet file"""
-        if not data:
-            return
-            
-        df = pd.DataFrame(data)
-        df = df.astype("string[pyarrow]").fillna("")
-        file_path = self.output_file
-        file_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        if  file_path.exists():
-            file_path.unlink()
-
-        df.to_parquet(file_path, engine="pyarrow", index=False)  # FIXED: Use pyarrow engine
-
-    
-
     async def fetch_meta_Data(self, session: AsyncSession, bundle_id: str, retries: int = 3, timeout: int = 30) -> dict:
         """Fetch metadata with retries"""
         url = self.lookup_url.format(bundle_id=bundle_id)
         attempt = 0  # FIXED: Added missing attempt variable
         
         while attempt < retries:
+            await self.rate_limiter.wait(url)
             async with self.semaphore:  # FIXED: Use instance semaphore
                 try:
-                    response = await session.get(
+                    response = await self.concurrency.timed(session.get(
                         url,
                         timeout=timeout,
                         impersonate="chrome",
                         allow_redirects=True,
                         headers=self.headers,
                         cookies=self.cookies
-                    )
+                    ))
                     res_status_code = response.status_code
                     logger.info(f"[{res_status_code}] {url}")
                     response.raise_for_status()
+                    # A captcha comes back as 200; it is retried and never stored as the app's page
+                    if self.concurrency.is_blocked(response):
+                        raise RuntimeError("blocked by a captcha page")
 
-                    meta_data = self.extract_appstore_(response.text)
+                    meta_data = await self.parser.parse(self.extract_appstore_, response.text)
                     result = {
                         "url": url,
                         "bundle_id": bundle_id,
@@ -171,13 +174,8 @@ class AmazonStoreConfig:
                         **meta_data
                     }
 
-                    self.output_data_list.append(result)  # FIXED: Use instance variable
-                    
-                    if len(self.output_data_list) >= self.batch_size:
-                        self.replace_to_parquet(self.output_data_list)
-                        self.output_data_list = []
-
-                    await asyncio.sleep(2)  # Reduced sleep time
+                    self.journal.done(bundle_id, result)
+                    self.output.append(result)
                     return result
                     
                 except Exception as e:
@@ -192,31 +190,15 @@ class AmazonStoreConfig:
                             "appstore_bundle_id": None,
                             "appstore_developer_url": None
                         }
-                        self.failure_data_list = [failure_result]
-                        
-                        if len(self.failure_data_list) >= self.batch_size:
-                            Path("failure_output").mkdir(exist_ok=True)
-                            self.replace_to_parquet(self.failure_data_list, Path("failure_output/amazon_failure.parquet"))
-                            self.failure_data_list.clear()
-                    await asyncio.sleep(2)
+                        self.journal.failed(bundle_id, failure_result)
+                        self.failures.append(failure_result)
+            if attempt < retries:
+                # Back off outside the semaphore so the slot serves other IDs meanwhile
+                await asyncio.sleep(self.retry_backoff)
         
         return failure_result
 
     async def process(self, input_path: Path):  # FIXED: Corrected parameter order
         """Process Amazon store bundle IDs"""
         # self.setup_logger()
-        
-        Path("output").mkdir(exist_ok=True)
-        df = pd.read_parquet(input_path)
-        ids = df["bundle_id"].dropna().unique().tolist()
-        
-        async with AsyncSession(impersonate="chrome", allow_redirects=True) as session:
-            tasks = [self.fetch_meta_Data(session, bid) for bid in ids]  # FIXED: Corrected method name
-            await asyncio.gather(*tasks)
-        
-        # Final writes
-        if self.output_data_list:
-            self.replace_to_parquet(self.output_data_list)
-        if self.failure_data_list:
-            Path("failure_output").mkdir(exist_ok=True)
-            self.replace_to_parquet(self.failure_data_list, Path("failure_output/amazon_failure.parquet"))
\ No newline at end of file
+        await crawl_store(self, "amazon", "Amazon Store", input_path, self.fetch_meta_Data)
@@ -3,27 +3,58 @@ import asyncio
 import os
 from pathlib import Path
 from curl_cffi.requests import AsyncSession
-from asyncio import Semaphore
-import pandas as pd
-from lxml import html
+import pyarrow as pa
 from typing import Dict, Optional, List
 from loguru import logger
 from dataclasses import dataclass, field
 import sys
+from store_validator.rate_limiter import HostRateLimiter, host_limiter
+from store_validator.adaptive import AdaptiveConcurrency
+from store_validator.checkpoint import CheckpointJournal, CHECKPOINT_DIR
+from store_validator.worker_pool import WorkerPool, crawl_store
+from store_validator.parse_pool import ParsePool, parse_pool
+from store_validator.parquet_sink import ParquetSink, output_schema
+from store_validator.head_fetch import HeadResponse, get_page
+from store_validator.extractor import ExtractRules, MetaExtractor
+
+ANDROID_RULES = ExtractRules(meta={
+    "appstore_store_id": "appstore:store_id",
+    "appstore_bundle_id": "appstore:bundle_id",
+    "appstore_developer_url": "appstore:developer_url",
+})
+android_extractor = MetaExtractor(ANDROID_RULES)
+ANDROID_SCHEMA = output_schema(["url", "bundle_id", "status_code", *ANDROID_RULES.meta],
+                               types={"status_code": pa.int16()}, dictionary=["appstore_developer_url"])
+
 
 @dataclass
 class appstoreManager:
     semaphore_limit: int = 5
-    batch_size: int = 100
+    max_concurrency: int = 32
+    queue_size: int = 1000
+    read_batch_size: int = 10_000
+    batch_size: int = 1000  # rows handed to the output writer thread at a time
+    rate_limiter: HostRateLimiter = field(default_factory=lambda: host_limiter)
+    parser: ParsePool = field(default_factory=lambda: parse_pool)
+    # Only <head> meta tags are needed, so the rest of the page is never downloaded
+    head_only: bool = True
+    head_fields: Dict[str, str] = field(default_factory=lambda: dict(ANDROID_RULES.meta))
+    retry_backoff: float = 2.0
+    checkpoint_dir: Path = CHECKPOINT_DIR
     output_dir: Path = Path("output")
     log_dir: Path = Path("logs/android_app.log")
     output_file: Path = Path("output/android.parquet")
+    failure_file: Path = Path("failure_output/android_failure.parquet")
     lookup_url: str = "https://play.google.com/store/apps/details?id={bundle_id}"
 
     def __post_init__(self):
-        self.semaphore = Semaphore(self.semaphore_limit)
-        self.output_data_list = []
-        self.failure_data_list = []
+        self.concurrency = AdaptiveConcurrency("android", initial=self.semaphore_limit,
+                                               max_limit=self.max_concurrency)
+        self.semaphore = self.concurrency
+        self.journal = CheckpointJournal("android", self.checkpoint_dir)
+        self.pool = WorkerPool("android", workers=self.max_concurrency, queue_size=self.queue_size)
+        self.output = ParquetSink(self.output_file, self.batch_size, schema=ANDROID_SCHEMA)
+        self.failures = ParquetSink(self.failure_file, self.batch_size)
 
     # def setup_logger(self):
     #     logger.remove()
@@ -43,52 +74,33 @@ class appstoreManager:
     
     @staticmethod
     def extract_appstore_meta_tags(content) -> Dict[str, Optional[str]]:
-        tree = html.fromstring(content)
-
-        def get_meta_content(name: str) -> Optional[str]:
-            result = tree.xpath(f'//meta[@name="{name}"]/@content')
-            return result[0] if result else None
-        
-        return {
-            "appstore_store_id": get_meta_content("appstore:store_id"),
-            "appstore_bundle_id": get_meta_content("appstore:bundle_id"),
-            "appstore_developer_url": get_meta_content("appstore:developer_url")
-        }
-
-    def replace_to_parquet(self, data, file_path=None):
-        if file_path is None:
-            file_path = self.output_file
-            
-        if not data:
-            return
-
-        df = pd.DataFrame(data)
-        df = df.astype("string[pyarrow]").fillna("")
-        file_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        if file_path.exists():
-            file_path.unlink()
+        return android_extractor.extract(content)
 
-        df.to_parquet(file_path, engine="pyarrow", index=False)
+    async def extract_meta(self, response) -> Dict[str, Optional[str]]:
+        """Meta tags from a head-only fetch, or the full page parsed in the parse pool."""
+        if isinstance(response, HeadResponse):
+            return response.fields(self.head_fields, default=None)
+        return await self.parser.parse(self.extract_appstore_meta_tags, response.text)
 
     async def fetch_with_retry(self, session: AsyncSession, bundle_id: str, retries: int = 3, timeout: int = 30) -> dict:
         attempt = 0
         url = self.lookup_url.format(bundle_id=bundle_id)
         
         while attempt < retries:
+            await self.rate_limiter.wait(url)
             async with self.semaphore:
                 try:
-                    response = await session.get(
-                        url, 
+                    response = await self.concurrency.timed(get_page(
+                        session, url, self.head_fields if self.head_only else None,
                         timeout=timeout,
                         impersonate="chrome",
                         allow_redirects=True
-                    )
+                    ))
                     res_status_code = response.status_code
                     logger.info(f"[{res_status_code}] {url}")
                     response.raise_for_status()
                     
-                    meta_data = self.extract_appstore_meta_tags(response.text)
+                    meta_data = await self.extract_meta(response)
                     result = {
                         "url": url,
                         "bundle_id": bundle_id,
@@ -96,13 +108,8 @@ class appstoreManager:
                         **meta_data
                     }
 
-                    self.output_data_list.append(result)
-                    
-                    if len(self.output_data_list) >= self.batch_size:
-                        self.replace_to_parquet(self.output_data_list)
-                        self.output_data_list = []
-                    
-                    await asyncio.sleep(2)
+                    self.journal.done(bundle_id, result)
+                    self.output.append(result)
                     return result
                     
                 except Exception as e:
@@ -117,36 +124,15 @@ class appstoreManager:
                             "appstore_bundle_id": None,
                             "appstore_developer_url": None
                         }
-                        self.failure_data_list=[failure_result]
-                    await asyncio.sleep(2)
+                        self.journal.failed(bundle_id, failure_result)
+                        self.failures.append(failure_result)
+            if attempt < retries:
+                # Back off outside the semaphore so the slot serves other IDs meanwhile
+                await asyncio.sleep(self.retry_backoff)
         
         return {}
 
     async def process(self, input_path: Path):
         """Process Android store bundle IDs"""
         # self.setup_logger()
-        
-        Path("output").mkdir(exist_ok=True)
-        
-        if not input_path.exists():
-            logger.error(f"Input file not found: {input_path}")
-            return
-            
-        df = pd.read_parquet(input_path)
-        ids = df["bundle_id"].dropna().unique().tolist()
-
-        logger.info(f"Processing {len(ids)} Android bundle IDs")
-        
-        async with AsyncSession(impersonate="chrome", allow_redirects=True) as session:
-            tasks = [self.fetch_with_retry(session, bid) for bid in ids]
-            await asyncio.gather(*tasks)
-        
-        # Write any remaining data
-        if self.output_data_list:
-            self.replace_to_parquet(self.output_data_list)
-            logger.success(f"Android Store data written with {len(self.output_data_list)} records")
-            
-        if self.failure_data_list:
-            Path("failure_output").mkdir(exist_ok=True)
-            self.replace_to_parquet(self.failure_data_list, Path("failure_output/android_failure.parquet"))
-            logger.info(f"Saved {len(self.failure_data_list)} failed results")
\ No newline at end of file
+        await crawl_store(self, "android", "Android Store", input_path, self.fetch_with_retry)
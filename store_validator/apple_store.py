@@ -1,41 +1,134 @@
 # CORRECTED apple.py
+import re
 import asyncio
+from contextlib import asynccontextmanager
 from pathlib import Path
 from curl_cffi.requests import AsyncSession
-from asyncio import Semaphore
-import pandas as pd
-from lxml import html
-from typing import Dict, Optional, List, Any
+import pyarrow as pa
+from typing import Dict, Optional, List, Tuple
 from dataclasses import dataclass, field
 from loguru import logger
 import sys
+from store_validator.rate_limiter import HostRateLimiter, host_limiter
+from store_validator.adaptive import AdaptiveConcurrency
+from store_validator.checkpoint import CheckpointJournal, CHECKPOINT_DIR
+from store_validator.worker_pool import DEFAULT_SESSION_OPTIONS, WorkerPool, crawl_store
+from store_validator.parse_pool import ParsePool, parse_pool
+from store_validator.parquet_sink import ParquetSink, output_schema
+from store_validator.extractor import ExtractRules, MetaExtractor
+
+APPLE_RULES = ExtractRules(
+    meta={
+        "appstore_store_id": "appstore:store_id",
+        "appstore_bundle_id": "appstore:bundle_id",
+        "appstore_developer_url": "appstore:developer_url",
+    },
+    links={
+        "developerWebsite": "Developer Website",
+        "appSupportUrl": "App Support",
+        "privacyPolicyUrl": "Privacy Policy",
+    },
+)
+apple_extractor = MetaExtractor(APPLE_RULES)
+# The lookup API only takes numeric track IDs; one other value fails the whole comma-joined request
+TRACK_ID = re.compile(r"[0-9]+")
+
 
 @dataclass
 class AppleStoreConfig:
-    """Configuration for Apple Store validator"""
+    """Configuration for Apple Store validator
+
+    Runs as a two-stage pipeline, one stage per host: chunks of IDs are
+    looked up on itunes.apple.com and each app that still needs its page is
+    streamed to the apps.apple.com stage as soon as its lookup returns. Each
+    stage has its own connection pool, concurrency limit and queue.
+
+    With ``developer_expansion`` every new developer (``artistId``) met in
+    a lookup is looked up once more with ``entity=software``, which returns
+    all of its apps. Those are cached, so later IDs from the same developer
+    are answered without a request, and apps with no sellerUrl of their own
+    take their developer's instead of needing their page.
+
+    IDs the default (US) lookup does not return are collected until a full
+    chunk is waiting and then retried in ``storefronts``, a few storefronts
+    at a time; each ID keeps the first storefront in list order that has
+    it and is not asked for again, so region-locked apps are found without
+    walking the countries one by one.
+    """
     semaphore_limit: int = 5
-    batch_size: int = 100
+    max_concurrency: int = 32
+    queue_size: int = 1000
+    read_batch_size: int = 10_000
+    batch_size: int = 1000  # rows handed to the output writer thread at a time
+    lookup_batch_size: int = 100  # IDs per iTunes lookup request (comma-separated)
+    lookup_workers: int = 4  # lookup chunks in flight
+    lookup_retries: int = 3  # attempts per lookup on errors, 429 and 5xx
+    retry_backoff: float = 2.0
+    developer_expansion: bool = False  # cache each developer's full app list (one extra lookup per developer)
+    # Storefronts tried, in order, for IDs the default lookup does not return (region-locked apps)
+    storefronts: List[str] = field(default_factory=lambda: ["gb", "ca", "au", "de", "fr", "jp", "cn", "kr",
+                                                             "in", "br"])
+    storefront_fanout: int = 4  # storefronts queried at once for each chunk of unresolved IDs
+    # App Store page enrichment (appstore_* meta, developerWebsite, appSupportUrl, privacyPolicyUrl):
+    # "missing" fetches the page only when the lookup has no sellerUrl, "all" for every app, "off" never
+    html_mode: str = "missing"
+    html_semaphore_limit: int = 5
+    html_max_concurrency: int = 32
+    html_workers: int = 32
+    html_queue_size: int = 1000
+    rate_limiter: HostRateLimiter = field(default_factory=lambda: host_limiter)
+    parser: ParsePool = field(default_factory=lambda: parse_pool)
+    checkpoint_dir: Path = CHECKPOINT_DIR
     output_dir: Path = Path("output")
     log_dir: Path = Path("logs")
     log_file: Path = Path("logs/apple_app.log")
     output_file: Path = Path("output/apple.parquet")  # FIXED: Changed from gallaxy.parquet
+    failure_file: Path = Path("failure_output/apple.parquet")
     
     # API endpoints
-    lookup_url: str = "https://itunes.apple.com/lookup?id={bundle_id}"
+    lookup_url: str = "https://itunes.apple.com/lookup?id={ids}"
+    developer_lookup_url: str = "https://itunes.apple.com/lookup?id={artist_id}&entity=software&limit=200"
+    storefront_lookup_url: str = "https://itunes.apple.com/lookup?id={ids}&country={country}"
     appstore_url: str = "https://apps.apple.com/app/id{track_id}"
+    storefront_appstore_url: str = "https://apps.apple.com/{country}/app/id{track_id}"
     
     # Required columns for schema normalization
     required_columns: List[str] = field(default_factory=lambda: [
-        "trackId", "bundleId", "trackName", "artistName",
+        "bundle_id", "trackId", "bundleId", "trackName", "artistName",
         "averageUserRating", "userRatingCount", "sellerUrl",
         "appstore_store_id", "appstore_bundle_id", "appstore_developer_url",
         "developerWebsite", "appSupportUrl", "privacyPolicyUrl"
     ])
+    column_types: Dict[str, pa.DataType] = field(default_factory=lambda: {
+        "trackId": pa.int64(),
+        "averageUserRating": pa.float64(),
+        "userRatingCount": pa.int64(),
+    })
+    # One developer publishes many apps, so these repeat across rows
+    dictionary_columns: List[str] = field(default_factory=lambda: [
+        "artistName", "sellerUrl", "appstore_developer_url",
+        "developerWebsite", "appSupportUrl", "privacyPolicyUrl",
+    ])
 
     def __post_init__(self):
-        self.semaphore = Semaphore(self.semaphore_limit)
-        self.output_data_list = []
-        self.failure_data_list = []
+        self.concurrency = AdaptiveConcurrency("apple", initial=self.semaphore_limit,
+                                               max_limit=self.max_concurrency)
+        self.semaphore = self.concurrency
+        # The page stage has its own limiter, so slow pages never hold back lookups
+        self.html_concurrency = AdaptiveConcurrency("apple-html", initial=self.html_semaphore_limit,
+                                                    max_limit=self.html_max_concurrency)
+        self.html_semaphore = self.html_concurrency
+        self.html_queue: Optional[asyncio.Queue] = None
+        self.unresolved: List[str] = []  # IDs waiting for the storefront retry
+        self.stats: Dict[str, int] = {}
+        self.developers: Dict[str, asyncio.Task] = {}  # artistId -> its expansion lookup
+        self.developer_apps: Dict[str, dict] = {}  # trackId -> lookup fields, from expanded developers
+        self.developer_seller_urls: Dict[str, Optional[str]] = {}  # artistId -> sellerUrl
+        self.journal = CheckpointJournal("apple", self.checkpoint_dir)
+        self.pool = WorkerPool("apple", workers=self.lookup_workers, queue_size=self.queue_size)
+        self.output_schema = output_schema(self.required_columns, self.column_types, self.dictionary_columns)
+        self.output = ParquetSink(self.output_file, self.batch_size, schema=self.output_schema)
+        self.failures = ParquetSink(self.failure_file, self.batch_size)
 
     # def setup_logger(self):
     #     logger.remove()
@@ -60,147 +153,340 @@ class AppleStoreConfig:
     @staticmethod
     def extract_meta_tags(content: str) -> Dict[str, Optional[str]]:
         """Extract App Store meta + body links (developer, support, privacy)."""
-        tree = html.fromstring(content)
-
-        def get_meta_content(name: str) -> Optional[str]:
-            result = tree.xpath(f'//meta[@name="{name}"]/@content')
-            return result[0] if result else None
+        return apple_extractor.extract(content)
 
-        # meta tags
-        meta_data = {
-            "appstore_store_id": get_meta_content("appstore:store_id"),
-            "appstore_bundle_id": get_meta_content("appstore:bundle_id"),
-            "appstore_developer_url": get_meta_content("appstore:developer_url"),
+    @staticmethod
+    def app_fields(meta: dict) -> dict:
+        """The lookup fields kept for an app (artistId is only used for developer expansion)."""
+        return {
+            "trackId": meta.get("trackId"),
+            "bundleId": meta.get("bundleId"),
+            "trackName": meta.get("trackName"),
+            "artistId": meta.get("artistId"),
+            "artistName": meta.get("artistName"),
+            "averageUserRating": meta.get("averageUserRating"),
+            "userRatingCount": meta.get("userRatingCount"),
+            "sellerUrl": meta.get("sellerUrl"),
         }
 
-        # page body links
-        developer_website = tree.xpath('//a[contains(text(), "Developer Website")]/@href')
-        app_support = tree.xpath('//a[contains(text(), "App Support")]/@href')
-        privacy_policy = tree.xpath('//a[contains(text(), "Privacy Policy")]/@href')
+    async def fetch_json_metadata(self, session: AsyncSession, bundle_ids: List[str],
+                                  country: Optional[str] = None) -> Dict[str, dict]:
+        """Fetch app metadata (JSON) for several IDs with one iTunes Lookup API request.
 
-        meta_data.update({
-            "developerWebsite": developer_website[0] if developer_website else "",
-            "appSupportUrl": app_support[0] if app_support else "",
-            "privacyPolicyUrl": privacy_policy[0] if privacy_policy else "",
-        })
-
-        return meta_data
+        ``results`` are matched back to the requested IDs by trackId; IDs the
+        API did not return are missing from the result. With ``country`` the
+        lookup is made in that storefront, which is recorded on each app.
+        """
+        if country is None:
+            url = self.lookup_url.format(ids=",".join(bundle_ids))
+            self.stats["lookups"] += 1
+            self.stats["looked_up"] += len(bundle_ids)
+        else:
+            url = self.storefront_lookup_url.format(ids=",".join(bundle_ids), country=country)
+            self.stats["storefront_lookups"] += 1
+        await self.rate_limiter.wait(url)
+        async with self.semaphore:
+            response = await self.concurrency.timed(session.get(url, impersonate="chrome", allow_redirects=True))
+            response.raise_for_status()
+            wanted = set(bundle_ids)
+            found: Dict[str, dict] = {}
+            for meta in response.json().get("results", []):
+                track_id = str(meta.get("trackId"))
+                if track_id in wanted and track_id not in found:
+                    found[track_id] = self.app_fields(meta)
+                    if country is not None:
+                        found[track_id]["storefront"] = country
+            return found
 
-    def append_to_parquet(self, data: List[Dict[str, Any]]):
-        """Append normalized data efficiently using pyarrow."""
-        if not data:
-            return
+    async def lookup(self, session: AsyncSession, bundle_ids: List[str],
+                     country: Optional[str] = None) -> Tuple[Dict[str, dict], List[str], List[str]]:
+        """``fetch_json_metadata`` with retries: the apps found, the IDs whose lookup failed and those rejected.
 
-        # normalize schema
-        normalized_data = [self.normalize_schema(d) for d in data]
+        Errors, 429s and 5xxs are retried ``lookup_retries`` times, ``retry_backoff``
+        apart. A chunk the API rejects twice with another 4xx (an ID it
+        cannot parse) is split in halves until the rejected ID stands alone,
+        so it no longer costs the rest of the chunk.
+        """
+        attempts = rejections = 0
+        while True:
+            try:
+                return await self.fetch_json_metadata(session, bundle_ids, country), [], []
+            except Exception as e:
+                status = getattr(getattr(e, "response", None), "status_code", None)
+                if status is not None and 400 <= status < 500 and status != 429:
+                    rejections += 1
+                    if rejections >= 2:
+                        break
+                else:
+                    attempts += 1
+                    if attempts >= self.lookup_retries:
+                        logger.error(f"Failed to look up {len(bundle_ids)} IDs ({bundle_ids[0]}, ...): {e}")
+                        return {}, list(bundle_ids), []
+                logger.warning(f"Lookup of {len(bundle_ids)} IDs failed, retrying: {e}")
+            # Back off outside the semaphore so the slot serves other chunks meanwhile
+            await asyncio.sleep(self.retry_backoff)
+        if len(bundle_ids) == 1:
+            logger.warning(f"iTunes lookup rejects ID {bundle_ids[0]}")
+            return {}, [], list(bundle_ids)
+        half = len(bundle_ids) // 2
+        (found, failed, rejected), (more_found, more_failed, more_rejected) = await asyncio.gather(
+            self.lookup(session, bundle_ids[:half], country), self.lookup(session, bundle_ids[half:], country))
+        return {**found, **more_found}, failed + more_failed, rejected + more_rejected
 
-        df = pd.DataFrame(normalized_data).astype("string[pyarrow]").fillna("")
-        self.output_file.parent.mkdir(parents=True, exist_ok=True)
+    async def fetch_developer(self, session: AsyncSession, artist_id: str):
+        """Cache every app of one developer, and its sellerUrl, from a single ``entity=software`` lookup."""
+        url = self.developer_lookup_url.format(artist_id=artist_id)
+        try:
+            await self.rate_limiter.wait(url)
+            self.stats["developer_lookups"] += 1
+            async with self.semaphore:
+                response = await self.concurrency.timed(session.get(url, impersonate="chrome",
+                                                                    allow_redirects=True))
+                response.raise_for_status()
+                results = response.json().get("results", [])
+        except Exception as e:
+            logger.error(f"Failed to expand developer {artist_id}: {e}")
+            return
+        # The first result is the developer itself, the rest its apps
+        apps = [self.app_fields(meta) for meta in results if meta.get("wrapperType") == "software"]
+        self.developer_seller_urls[artist_id] = next((app["sellerUrl"] for app in apps if app["sellerUrl"]), None)
+        for app in apps:
+            self.developer_apps.setdefault(str(app["trackId"]), app)
 
-        # if self.output_file.exists():
-        #     existing_df = pd.read_parquet(self.output_file)
-        #     combined_df = pd.concat([existing_df, df], ignore_index=True)
-        #     combined_df.to_parquet(self.output_file, engine="pyarrow", index=False)
-        # else:
-        df.to_parquet(self.output_file, engine="pyarrow", index=False)
+    async def expand_developers(self, session: AsyncSession, apps: List[dict]):
+        """Start the lookup of each developer not seen yet; wait only for those whose apps lack a sellerUrl."""
+        for app in apps:
+            artist_id = str(app.get("artistId") or "")
+            if artist_id and artist_id not in self.developers:
+                self.developers[artist_id] = asyncio.create_task(self.fetch_developer(session, artist_id))
+        needed = {str(app["artistId"]) for app in apps if app.get("artistId") and not app.get("sellerUrl")}
+        if needed:
+            await asyncio.gather(*(self.developers[artist_id] for artist_id in needed))
+        for app in apps:
+            if not app.get("sellerUrl"):
+                seller_url = self.developer_seller_urls.get(str(app.get("artistId") or ""))
+                if seller_url:
+                    app["sellerUrl"] = seller_url
+                    self.stats["developer_seller_urls"] += 1
 
-    async def fetch_json_metadata(self, session: AsyncSession, bundle_id: str) -> dict:
-        """Fetch app metadata (JSON) from iTunes Lookup API."""
-        async with self.semaphore:
-            url = self.lookup_url.format(bundle_id=bundle_id)
-            response = await session.get(url, impersonate="chrome", allow_redirects=True)
-            response.raise_for_status()
-            results = response.json().get("results", [])
-            if results:
-                meta = results[0]
-                return {
-                    "trackId": meta.get("trackId"),
-                    "bundleId": meta.get("bundleId"),
-                    "trackName": meta.get("trackName"),
-                    "artistName": meta.get("artistName"),
-                    "averageUserRating": meta.get("averageUserRating"),
-                    "userRatingCount": meta.get("userRatingCount"),
-                    "sellerUrl": meta.get("sellerUrl"), 
-                }
-            return {}
-
-    async def fetch_html_metadata(self, session: AsyncSession, track_id: str) -> dict:
+    async def fetch_html_metadata(self, session: AsyncSession, track_id: str,
+                                  country: Optional[str] = None) -> dict:
         """Fetch developer URL (HTML page) from App Store."""
-        async with self.semaphore:
+        if country is None:
             url = self.appstore_url.format(track_id=track_id)
-            response = await session.get(url, impersonate="chrome", allow_redirects=True)
+        else:
+            url = self.storefront_appstore_url.format(country=country, track_id=track_id)
+        await self.rate_limiter.wait(url)
+        self.stats["pages"] += 1
+        async with self.html_semaphore:
+            response = await self.html_concurrency.timed(session.get(url, impersonate="chrome",
+                                                                     allow_redirects=True))
             response.raise_for_status()
-            return self.extract_meta_tags(response.text)
+            return await self.parser.parse(self.extract_meta_tags, response.text)
 
-    async def fetch_with_merge(self, session: AsyncSession, bundle_id: str,retries:int=3,) -> dict:
-        """Fetch JSON + HTML metadata and merge results."""
-        try:
-            json_meta = await self.fetch_json_metadata(session, bundle_id)
-            if not json_meta:
-                logger.warning(f"No JSON metadata for {bundle_id}")
-                return {}
+    def needs_html(self, json_meta: dict) -> bool:
+        if self.html_mode == "all":
+            return True
+        return self.html_mode != "off" and not json_meta.get("sellerUrl")
 
+    async def fetch_batch(self, session: AsyncSession, bundle_ids: List[str]):
+        """One lookup for a chunk of IDs; apps the JSON answers are saved at once, the rest queued for their page.
+
+        IDs already cached by developer expansion are answered without a request.
+        """
+        found: Dict[str, dict] = {}
+        if self.developer_expansion:
+            found = {bundle_id: dict(self.developer_apps[bundle_id])
+                     for bundle_id in bundle_ids if bundle_id in self.developer_apps}
+            self.stats["cache_hits"] += len(found)
+        to_look_up = [bundle_id for bundle_id in bundle_ids
+                      if bundle_id not in found and TRACK_ID.fullmatch(bundle_id)]
+        invalid = [bundle_id for bundle_id in bundle_ids if bundle_id not in found and bundle_id not in to_look_up]
+        if invalid:
+            logger.warning(f"{len(invalid)} IDs are not numeric track IDs: {invalid[:5]}")
+        failed: List[str] = []
+        if to_look_up:
+            looked_up, failed, rejected = await self.lookup(session, to_look_up)
+            found.update(looked_up)
+            invalid += rejected
+            for bundle_id in failed:
+                self.record_failure(bundle_id)
+        # Neither non-numeric nor rejected IDs can turn up in another storefront
+        for bundle_id in invalid:
+            self.record_not_found(bundle_id)
+        settled = set(failed) | set(invalid)
+        missing = [bundle_id for bundle_id in to_look_up if bundle_id not in found and bundle_id not in settled]
+        if missing:
+            logger.warning(f"No JSON metadata for {len(missing)} of {len(to_look_up)} IDs: {missing[:5]}")
+            if self.storefronts:
+                self.unresolved.extend(missing)
+            else:
+                for bundle_id in missing:
+                    self.record_not_found(bundle_id)
+        await self.route(session, found)
+        if len(self.unresolved) >= self.lookup_batch_size:
+            await self.retry_unresolved(session)
+
+    async def route(self, session: AsyncSession, found: Dict[str, dict]):
+        """Save each looked-up app, or queue it for the page stage when it still needs its page."""
+        if self.developer_expansion and found:
+            await self.expand_developers(session, list(found.values()))
+        for bundle_id in found:
+            if self.needs_html(found[bundle_id]):
+                await self.html_queue.put((bundle_id, found[bundle_id]))
+                self.stats["page_queue_peak"] = max(self.stats["page_queue_peak"], self.html_queue.qsize())
+            else:
+                self.save(bundle_id, found[bundle_id])
+
+    async def lookup_in_storefronts(self, session: AsyncSession,
+                                    bundle_ids: List[str]) -> Tuple[Dict[str, dict], set]:
+        """Look ``bundle_ids`` up in ``storefronts``, ``storefront_fanout`` at a time.
+
+        An ID keeps the earliest storefront in list order that returned it
+        and is left out of the later ones. Also returns the IDs whose lookup
+        failed in some storefront, which are therefore not known to be missing.
+        """
+        found: Dict[str, dict] = {}
+        uncertain = set()
+        remaining = list(bundle_ids)
+        for start in range(0, len(self.storefronts), self.storefront_fanout):
+            if not remaining:
+                break
+            wave = self.storefronts[start:start + self.storefront_fanout]
+            results = await asyncio.gather(*(self.lookup(session, remaining, country) for country in wave))
+            for country, (result, failed, _) in zip(wave, results):
+                if failed:
+                    logger.error(f"Failed to look up {len(failed)} IDs in storefront {country}")
+                    uncertain.update(failed)
+                for bundle_id, meta in result.items():
+                    found.setdefault(bundle_id, meta)
+            remaining = [bundle_id for bundle_id in remaining if bundle_id not in found]
+        return found, uncertain
+
+    async def retry_unresolved(self, session: AsyncSession, flush: bool = False):
+        """Retry the collected unresolved IDs elsewhere a full chunk at a time; ``flush`` retries the rest too."""
+        while len(self.unresolved) >= self.lookup_batch_size or (flush and self.unresolved):
+            batch = self.unresolved[:self.lookup_batch_size]
+            del self.unresolved[:self.lookup_batch_size]
+            found, uncertain = await self.lookup_in_storefronts(session, batch)
+            self.stats["storefront_hits"] += len(found)
+            for bundle_id in batch:
+                if bundle_id in found:
+                    continue
+                # A failed request may have hidden the ID, so it is retried on the next run
+                if bundle_id in uncertain:
+                    self.record_failure(bundle_id)
+                else:
+                    self.record_not_found(bundle_id)
+            await self.route(session, found)
+
+    def save(self, bundle_id: str, data: dict) -> dict:
+        merged = self.normalize_schema({**data, "bundle_id": bundle_id})
+        self.journal.done(bundle_id, merged)
+        self.output.append(merged)
+        return merged
+
+    def record_not_found(self, bundle_id: str):
+        """An ID Apple does not know: written as a row without a sellerUrl, so the permanent store
+        records it and freshness waits ``empty_ttl_days`` before asking again."""
+        row = self.normalize_schema({"bundle_id": bundle_id})
+        self.stats["not_found"] += 1
+        self.journal.not_found(bundle_id, row)
+        self.output.append(row)
+
+    async def html_worker(self, session: AsyncSession):
+        """Page stage: enriches the looked-up apps taken from ``html_queue`` until it gets None."""
+        while True:
+            item = await self.html_queue.get()
+            if item is None:
+                return
+            await self.fetch_with_merge(session, *item)
+
+    async def fetch_with_merge(self, session: AsyncSession, bundle_id: str, json_meta: dict) -> dict:
+        """Fetch the HTML metadata of a looked-up app and merge it with its JSON."""
+        try:
             track_id = json_meta.get("trackId")
             html_meta = {}
             if track_id:  # fetch HTML only if we have trackId
                 try:
-                    html_meta = await self.fetch_html_metadata(session, str(track_id))
+                    html_meta = await self.fetch_html_metadata(session, str(track_id),
+                                                               json_meta.get("storefront"))
                 except Exception as e:
                     logger.error(f"Failed to fetch HTML for {bundle_id}: {e}")
 
-            merged = {**json_meta, **html_meta}
-            return self.normalize_schema(merged)
+            return self.save(bundle_id, {**json_meta, **html_meta})
 
         except Exception as e:
             logger.error(f"Failed to fetch metadata for {bundle_id}: {e}")
-            attempt = 0
-            while attempt < retries:
-                attempt+=1
-                if attempt== retries:
-                    failure_result= {
-                            "trackId": self.lookup_url,
-                            "bundleId": bundle_id,
-                            "trackName":None,
-                            "artistName": None,
-                            "averageUserRating": None,
-                            "userRatingCount": None,
-                            "sellerUrl": None
-
-                    }
-                    self.failure_data_list=[failure_result]
+            self.record_failure(bundle_id)
         return {}
 
+    def record_failure(self, bundle_id: str):
+        failure_result = {
+            "bundle_id": bundle_id,
+            "trackId": self.lookup_url.format(ids=bundle_id),
+            "bundleId": bundle_id,
+            "trackName": None,
+            "artistName": None,
+            "averageUserRating": None,
+            "userRatingCount": None,
+            "sellerUrl": None,
+        }
+        self.journal.failed(bundle_id, failure_result)
+        self.failures.append(self.normalize_schema(failure_result))
+
+    @asynccontextmanager
+    async def page_stage(self, lookup_session: AsyncSession):
+        """Runs the page workers around the lookup stage, then retries the unresolved IDs and drains them.
+
+        Pages come from their own connection pool, sized to the page limit (curl_cffi defaults to 10
+        handles per session, which lookups and page downloads would otherwise compete for).
+        """
+        async with AsyncSession(impersonate="chrome", allow_redirects=True,
+                                max_clients=self.html_max_concurrency) as page_session:
+            # Pages are fetched in the background while later chunks are still being looked up
+            self.html_queue = asyncio.Queue(maxsize=self.html_queue_size)
+            html_stage = [asyncio.create_task(self.html_worker(page_session)) for _ in range(self.html_workers)]
+            try:
+                yield
+                await self.retry_unresolved(lookup_session, flush=True)
+                for _ in html_stage:
+                    await self.html_queue.put(None)
+                await asyncio.gather(*html_stage)
+            finally:
+                # Expansions still running can only warm a cache nothing will read any more
+                for task in [*html_stage, *self.developers.values()]:
+                    task.cancel()
+
     async def process(self, input_path: Path):
         """Process Apple store bundle IDs"""
         # self.setup_logger()
-        
-        if not input_path.exists():
-            logger.error(f"Input file not found: {input_path}")
+        self.stats = {"lookups": 0, "looked_up": 0, "pages": 0, "page_queue_peak": 0,
+                      "developer_lookups": 0, "cache_hits": 0, "developer_seller_urls": 0,
+                      "storefront_lookups": 0, "storefront_hits": 0, "not_found": 0}
+        self.unresolved = []
+        self.developers, self.developer_apps, self.developer_seller_urls = {}, {}, {}
+        done = await crawl_store(
+            self, "apple", "Apple Store", input_path,
+            lambda session, ids: self.fetch_batch(session, [str(bid) for bid in ids]),
+            chunk_size=self.lookup_batch_size,
+            session_options={**DEFAULT_SESSION_OPTIONS, "headers": {"accept": "application/json"}},
+            stage=self.page_stage,
+        )
+        if done is None:
             return
-            
-        df = pd.read_parquet(input_path)
-        ids = df["bundle_id"].dropna().unique().tolist()
-        
-        logger.info(f"Processing {len(ids)} Apple bundle IDs")
-        
-        async with AsyncSession(impersonate="chrome", allow_redirects=True) as session:
-            session.headers["accept"] = "application/json"
-            tasks = [self.fetch_with_merge(session, str(app_id)) for app_id in ids]
-            results = await asyncio.gather(*tasks)
-            
-            # Add successful results to output_data_list
-            for result in results:
-                if result:  # Only add non-empty results
-                    self.output_data_list.append(result)
-
-            # Final flush
-            if self.output_data_list:
-                self.append_to_parquet(self.output_data_list)
-                logger.success(f"Apple Store data written to {self.output_file} with {len(self.output_data_list)} records")
-            else:
-                logger.warning("No Apple Store data to write")
-            
-            if self.failure_data_list:
-                Path("failure_output").mkdir(exist_ok=True)
-                self.append_to_parquet(self.failure_data_list, Path("failure_output/apple.parquet"))
-                logger.info(f"Saved {len(self.failure_data_list)} failed results")
\ No newline at end of file
+        logger.info(f"Apple pipeline: {self.stats['lookups']} lookups, {self.stats['pages']} pages "
+                    f"(html_mode={self.html_mode}), page queue peaked at "
+                    f"{self.stats['page_queue_peak']}/{self.html_queue_size}, "
+                    f"{self.stats['not_found']} IDs not found")
+        if self.storefronts:
+            logger.info(f"Apple storefronts: {self.stats['storefront_hits']} unresolved IDs found outside the "
+                        f"default storefront with {self.stats['storefront_lookups']} lookups")
+        if self.developer_expansion:
+            answered = self.stats["cache_hits"] + self.stats["looked_up"]
+            hit_rate = self.stats["cache_hits"] / answered if answered else 0.0
+            logger.info(f"Apple developer cache: {self.stats['cache_hits']}/{answered} IDs answered from "
+                        f"{len(self.developers)} developers ({hit_rate:.1%} hit rate, "
+                        f"{self.stats['developer_lookups']} developer lookups), "
+                        f"{self.stats['developer_seller_urls']} sellerUrls taken from the developer")
+
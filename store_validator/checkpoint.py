@@ -0,0 +1,146 @@
+# checkpoint.py
+import json
+import time
+import sqlite3
+from pathlib import Path
+from loguru import logger
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+CHECKPOINT_DIR = Path("output/checkpoints")
+
+
+class CheckpointJournal:
+    """Per-ID status journal for one store's crawl, kept in SQLite.
+
+    Every bundle ID is pending, done, not_found or failed, and all but pending
+    rows can keep their result so the output parquet can be rebuilt after a
+    crash. A run that never reached ``finish()`` is resumed: ``pending()``
+    filters each batch of input IDs down to those that still need fetching.
+    One file per store keeps concurrent stores from contending for the same
+    write lock.
+    """
+
+    def __init__(self, store: str, checkpoint_dir: Path = CHECKPOINT_DIR,
+                 commit_every: int = 50, commit_interval: float = 2.0):
+        self.store = store
+        self.path = Path(checkpoint_dir) / f"{store}.sqlite"
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+        self.conn: Optional[sqlite3.Connection] = None
+        self.uncommitted = 0
+        self.last_commit = time.monotonic()
+        self.already_done = 0
+
+    def connect(self) -> sqlite3.Connection:
+        if self.conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(self.path)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS journal (
+                    bundle_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    result TEXT,
+                    updated_at REAL
+                ) WITHOUT ROWID
+            """)
+            self.conn.commit()
+        return self.conn
+
+    def start(self):
+        """Begin registering this run's input IDs (see ``pending``)."""
+        conn = self.connect()
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS run_ids (bundle_id TEXT PRIMARY KEY) WITHOUT ROWID")
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS batch_ids (bundle_id TEXT PRIMARY KEY) WITHOUT ROWID")
+        conn.execute("DELETE FROM run_ids")
+        self.already_done = 0
+
+    def pending(self, ids: Iterable[str],
+                resumed: Optional[Callable[[List[Dict[str, Any]]], Any]] = None) -> List[str]:
+        """Register a batch of this run's IDs and return those not already done.
+
+        ``resumed`` receives the stored results of the IDs that are skipped, so
+        a streaming output can include work finished before a restart. Each
+        keeps the time it was recorded as its ``fetched_at``.
+        """
+        conn = self.connect()
+        ids = [str(bid) for bid in ids]
+        conn.execute("DELETE FROM batch_ids")
+        conn.executemany("INSERT OR IGNORE INTO batch_ids VALUES (?)", ((bid,) for bid in sorted(ids)))
+        conn.execute("INSERT OR IGNORE INTO run_ids SELECT bundle_id FROM batch_ids")
+        conn.execute("""
+            INSERT OR IGNORE INTO journal (bundle_id, status, updated_at)
+            SELECT bundle_id, 'pending', ? FROM batch_ids
+        """, (time.time(),))
+        rows = conn.execute(
+            "SELECT bundle_id, result, updated_at FROM journal JOIN batch_ids USING (bundle_id) "
+            "WHERE status IN ('done', 'not_found')"
+        ).fetchall()
+        done = {bundle_id for bundle_id, _, _ in rows}
+        self.commit()
+        if resumed is not None and rows:
+            resumed([{"fetched_at": datetime.fromtimestamp(updated_at, timezone.utc).isoformat(),
+                      **json.loads(result)} for _, result, updated_at in rows if result])
+        self.already_done += len(done)
+        return [bid for bid in ids if bid not in done]
+
+    def mark(self, bundle_id: str, status: str, result: Optional[Dict[str, Any]] = None):
+        self.connect().execute(
+            "INSERT OR REPLACE INTO journal (bundle_id, status, result, updated_at) VALUES (?, ?, ?, ?)",
+            (str(bundle_id), status, json.dumps(result, default=str) if result else None, time.time()),
+        )
+        self.uncommitted += 1
+        # A hard kill loses at most commit_every rows or commit_interval seconds of work
+        if self.uncommitted >= self.commit_every or time.monotonic() - self.last_commit >= self.commit_interval:
+            self.commit()
+
+    def done(self, bundle_id: str, result: Optional[Dict[str, Any]] = None):
+        self.mark(bundle_id, "done", result)
+
+    def failed(self, bundle_id: str, result: Optional[Dict[str, Any]] = None):
+        self.mark(bundle_id, "failed", result)
+
+    def not_found(self, bundle_id: str, result: Optional[Dict[str, Any]] = None):
+        """The store answered but does not know this ID; like done, it is not fetched again on resume."""
+        self.mark(bundle_id, "not_found", result)
+
+    def commit(self):
+        if self.conn is not None:
+            self.conn.commit()
+        self.uncommitted = 0
+        self.last_commit = time.monotonic()
+
+    def results(self, status: str = "done") -> List[Dict[str, Any]]:
+        """Stored result rows for this run's IDs with this status, ordered by bundle_id.
+
+        IDs left over from an earlier input that this run did not register are
+        ignored, so a changed input never resurrects stale results.
+        """
+        self.commit()
+        rows = self.connect().execute("""
+            SELECT result FROM journal
+            WHERE status = ? AND result IS NOT NULL AND bundle_id IN (SELECT bundle_id FROM temp.run_ids)
+            ORDER BY bundle_id
+        """, (status,))
+        return [json.loads(result) for (result,) in rows]
+
+    def counts(self) -> Dict[str, int]:
+        rows = self.connect().execute("SELECT status, COUNT(*) FROM journal GROUP BY status")
+        return dict(rows.fetchall())
+
+    def finish(self):
+        """The run completed and its output is written; the next run starts from scratch."""
+        resumed = f", {self.already_done} carried over from an interrupted run" if self.already_done else ""
+        logger.info(f"{self.store}: checkpoint finished {self.counts()}{resumed}")
+        self.connect().execute("DELETE FROM journal")
+        self.commit()
+        self.close()
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.commit()
+            self.conn.close()
+            self.conn = None
+        self.uncommitted = 0
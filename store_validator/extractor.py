@@ -0,0 +1,102 @@
+# extractor.py
+import re
+import json
+from lxml import html
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+JSON_LD_TYPE = "application/ld+json"
+
+
+@dataclass(frozen=True)
+class ExtractRules:
+    """What one store reads from its app page, as {output key: selector}.
+
+    ``meta``: ``<meta name=...>`` (or ``property=...``) whose content is wanted.
+    ``links``: text an ``<a>`` must contain for its href to be taken.
+    ``json_ld``: dotted path into a ``<script type="application/ld+json">`` block.
+    The first match in document order wins, as with the old ``xpath(...)[0]``.
+    """
+    meta: Dict[str, str] = field(default_factory=dict)
+    links: Dict[str, str] = field(default_factory=dict)
+    json_ld: Dict[str, str] = field(default_factory=dict)
+    default: Any = None
+
+
+class MetaExtractor:
+    """Pulls every field of an ``ExtractRules`` out of a page in one pass over the tree.
+
+    Rules are compiled once: meta names into a lookup dict, link texts into a
+    single regex alternation and JSON-LD paths into key tuples. The walk only
+    visits the element types a store asked for and stops as soon as every
+    field has been found, so a meta-only store never looks past ``<head>``.
+    """
+
+    def __init__(self, rules: ExtractRules):
+        self.rules = rules
+        self.meta_keys: Dict[str, str] = {name: key for key, name in rules.meta.items()}
+        self.link_keys: Dict[str, str] = {text: key for key, text in rules.links.items()}
+        self.link_pattern = (re.compile("|".join(re.escape(text) for text in self.link_keys))
+                             if self.link_keys else None)
+        self.json_ld_paths = {key: tuple(path.split(".")) for key, path in rules.json_ld.items()}
+        self.tags = tuple(tag for tag, wanted in (("meta", rules.meta), ("a", rules.links),
+                                                  ("script", rules.json_ld)) if wanted)
+        self.n_fields = len(rules.meta) + len(rules.links) + len(rules.json_ld)
+
+    def __getstate__(self):
+        # Compiled state is rebuilt from the rules, so the extractor ships cheaply to process workers
+        return self.rules
+
+    def __setstate__(self, rules: ExtractRules):
+        self.__init__(rules)
+
+    def empty(self) -> Dict[str, Any]:
+        return {key: self.rules.default for key in (*self.rules.meta, *self.rules.links, *self.rules.json_ld)}
+
+    def extract(self, content) -> Dict[str, Any]:
+        """Parse a page and return every rule's field (``default`` where nothing matched)."""
+        return self.extract_tree(html.fromstring(content))
+
+    def walk(self, tree):
+        # lxml's filtered iter() looks one match ahead, so <head> and <body> are walked
+        # separately; otherwise finding the last head tag would still scan the whole body
+        for section in (tree if tree.tag == "html" else (tree,)):
+            yield from section.iter(*self.tags)
+
+    def extract_tree(self, tree) -> Dict[str, Any]:
+        found: Dict[str, Any] = {}
+        for el in self.walk(tree):
+            tag = el.tag
+            if tag == "meta":
+                name = el.get("name") or el.get("property")
+                key = self.meta_keys.get(name)
+                if key is not None and key not in found:
+                    found[key] = el.get("content")
+            elif tag == "a":
+                text = el.text
+                match = self.link_pattern.search(text) if text else None
+                while match:
+                    key = self.link_keys[match.group(0)]
+                    if key not in found:
+                        found[key] = el.get("href")
+                    match = self.link_pattern.search(text, match.start() + 1)
+            elif el.get("type") == JSON_LD_TYPE:
+                self.read_json_ld(el.text, found)
+            if len(found) == self.n_fields:
+                break
+        return {key: found.get(key) or self.rules.default for key in self.empty()}
+
+    def read_json_ld(self, text: Optional[str], found: Dict[str, Any]):
+        try:
+            data = json.loads(text or "")
+        except ValueError:
+            return
+        for item in data if isinstance(data, list) else [data]:
+            for key, path in self.json_ld_paths.items():
+                if key in found:
+                    continue
+                value = item
+                for part in path:
+                    value = value.get(part) if isinstance(value, dict) else None
+                if value not in (None, "") and not isinstance(value, (dict, list)):
+                    found[key] = str(value)
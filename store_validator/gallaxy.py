@@ -2,27 +2,46 @@
 import asyncio
 from pathlib import Path
 from curl_cffi.requests import AsyncSession
-from asyncio import Semaphore
-import pandas as pd
 from lxml import html
 from typing import Dict, Optional, List
 from loguru import logger
 from dataclasses import dataclass, field
 import sys
+from store_validator.rate_limiter import HostRateLimiter, host_limiter
+from store_validator.adaptive import AdaptiveConcurrency
+from store_validator.checkpoint import CheckpointJournal, CHECKPOINT_DIR
+from store_validator.worker_pool import WorkerPool, crawl_store
+from store_validator.parquet_sink import ParquetSink, output_schema
+
+# Seller details repeat for every app of the same seller
+GALLAXY_SCHEMA = output_schema(["bundle_id", "trade_name", "site", "address", "registration_number"],
+                               dictionary=["trade_name", "site", "address", "registration_number"])
+
 
 @dataclass
 class GallaxyManager:
     semaphore_limit: int = 5
-    batch_size: int = 100
+    max_concurrency: int = 32
+    queue_size: int = 1000
+    read_batch_size: int = 10_000
+    batch_size: int = 1000  # rows handed to the output writer thread at a time
+    rate_limiter: HostRateLimiter = field(default_factory=lambda: host_limiter)
+    retry_backoff: float = 2.0
+    checkpoint_dir: Path = CHECKPOINT_DIR
     output_dir: Path = Path("output")
     log_dir: Path = Path("logs/gallaxy.log")
     output_file: Path = Path("output/gallaxy.parquet")
+    failure_file: Path = Path("failure_output/gallaxy_failure.parquet")
     lookup_url: str = "https://galaxystore.samsung.com/api/detail/{bundle_id}"
 
     def __post_init__(self):
-        self.semaphore = Semaphore(self.semaphore_limit)
-        self.output_data_list = []
-        self.failure_data_list = []
+        self.concurrency = AdaptiveConcurrency("gallaxy", initial=self.semaphore_limit,
+                                               max_limit=self.max_concurrency)
+        self.semaphore = self.concurrency
+        self.journal = CheckpointJournal("gallaxy", self.checkpoint_dir)
+        self.pool = WorkerPool("gallaxy", workers=self.max_concurrency, queue_size=self.queue_size)
+        self.output = ParquetSink(self.output_file, self.batch_size, schema=GALLAXY_SCHEMA)
+        self.failures = ParquetSink(self.failure_file, self.batch_size)
 
     # def setup_logger(self):
     #     logger.remove()
@@ -40,31 +59,16 @@ class GallaxyManager:
     #     logger.add(sys.stdout, level="INFO")
     #     logger.info(f"Logging started in file: {self.log_dir}")
     
-    def replace_to_parquet(self, data, file_path=None):
-        if file_path is None:
-            file_path = self.output_file
-            
-        if not data:
-            return
-
-        df = pd.DataFrame(data)
-        df = df.astype("string[pyarrow]").fillna("")
-        file_path.parent.mkdir(parents=True, exist_ok=True)
-
-        if file_path.exists():
-            file_path.unlink()
-
-        df.to_parquet(file_path, engine="pyarrow", index=False)
-
     async def fetch_Data_app(self, session: AsyncSession, bundle_id: str, retries: int = 3) -> Dict:
         attempt = 0
         url = self.lookup_url.format(bundle_id=bundle_id)
         
         while attempt < retries:
+            await self.rate_limiter.wait(url)
             async with self.semaphore:
                 try:
                     headers = {"User-Agent": "Mozilla/5.0"}
-                    response = await session.get(url, headers=headers)
+                    response = await self.concurrency.timed(session.get(url, headers=headers))
                     data = response.json()
                     logger.debug(f"Full response JSON for {bundle_id}: {data}")
 
@@ -78,43 +82,27 @@ class GallaxyManager:
                         "address": seller.get("firstSellerAddress", ""),
                         "registration_number": seller.get("registrationNumber", ""),
                     }
-                    self.output_data_list.append(result)
+                    self.journal.done(bundle_id, result)
+                    self.output.append(result)
                     return result
 
                 except Exception as e:
                     attempt += 1
                     logger.error(f"Retry {attempt} failed for {url}: {e}")
                     if attempt == retries:
-                        self.failure_data_list.append({
+                        failure_result = {
                             "bundle_id": bundle_id,
                             "error": str(e)
-                        })
-                    await asyncio.sleep(2)
+                        }
+                        self.journal.failed(bundle_id, failure_result)
+                        self.failures.append(failure_result)
+            if attempt < retries:
+                # Back off outside the semaphore so the slot serves other IDs meanwhile
+                await asyncio.sleep(self.retry_backoff)
         
         return {}
 
     async def process(self, input_path: Path):
         # self.setup_logger()
-        
-        Path("output").mkdir(exist_ok=True)
-        
-        if not input_path.exists():
-            logger.error(f"Input file not found: {input_path}")
-            return
-            
-        df = pd.read_parquet(input_path)
-        ids = df["bundle_id"].dropna().unique().tolist()
-
-        logger.info(f"Processing {len(ids)} Gallaxy bundle IDs")
-        
-        async with AsyncSession() as session:
-            tasks = [self.fetch_Data_app(session, app_id) for app_id in ids]
-            await asyncio.gather(*tasks)
-
-        if self.output_data_list:
-            self.replace_to_parquet(self.output_data_list)
-            logger.info(f"Saved {len(self.output_data_list)} Gallaxy results")
-            
-        if self.failure_data_list:
-            Path("failure_output").mkdir(exist_ok=True)
-            self.replace_to_parquet(self.failure_data_list, Path("failure_output/gallaxy_failure.parquet"))
\ No newline at end of file
+        # The Galaxy Store API is called with a plain session, without browser impersonation
+        await crawl_store(self, "gallaxy", "Gallaxy", input_path, self.fetch_Data_app, session_options={})
@@ -0,0 +1,91 @@
+# head_fetch.py
+import re
+from html import unescape
+from typing import Any, Dict, Iterable, Optional
+
+META_TAG = re.compile(rb"<meta\b[^>]*>", re.IGNORECASE)
+PARTIAL_META = re.compile(rb"<meta\b[^>]*\Z", re.IGNORECASE)
+META_ATTR = re.compile(rb"""([\w:.-]+)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))""")
+HEAD_END = re.compile(rb"</head\s*>|<body[\s>]", re.IGNORECASE)
+MAX_HEAD_BYTES = 512 * 1024
+
+
+class HeadScanner:
+    """Incremental scanner that collects ``<meta name=... content=...>`` tags.
+
+    Feed it response chunks; ``feed`` returns True once every wanted tag has
+    been seen, ``</head>`` (or ``<body>``) has arrived, or ``max_bytes`` were
+    read, at which point the rest of the page can be dropped.
+    """
+
+    def __init__(self, wanted: Iterable[str], max_bytes: int = MAX_HEAD_BYTES):
+        self.wanted = set(wanted)
+        self.max_bytes = max_bytes
+        self.meta: Dict[str, str] = {}
+        self.buffer = bytearray()
+        self.pos = 0
+        self.head_closed = False
+
+    def feed(self, chunk: bytes) -> bool:
+        tail_start = max(0, len(self.buffer) - 16)
+        self.buffer += chunk
+        for match in META_TAG.finditer(self.buffer, self.pos):
+            self.pos = match.end()
+            attrs = {}
+            for name, dq, sq, bare in META_ATTR.findall(match.group(0)):
+                attrs[name.lower()] = dq or sq or bare
+            key = (attrs.get(b"name") or attrs.get(b"property") or b"").decode("utf-8", "replace")
+            if key in self.wanted and key not in self.meta:
+                self.meta[key] = unescape(attrs.get(b"content", b"").decode("utf-8", "replace"))
+        # Resume after what is already scanned, keeping a tag cut off mid-chunk
+        partial = PARTIAL_META.search(self.buffer, self.pos)
+        self.pos = partial.start() if partial else max(self.pos, len(self.buffer) - 5)
+        # Only the new bytes (plus a small overlap for a split tag) can hold the end of <head>
+        if HEAD_END.search(self.buffer, tail_start):
+            self.head_closed = True
+        return self.head_closed or self.wanted <= self.meta.keys() or len(self.buffer) >= self.max_bytes
+
+
+class HeadResponse:
+    """What a head-only fetch returns: the status and headers plus the scanned meta tags."""
+
+    def __init__(self, response, scanner: HeadScanner):
+        self.response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.url = getattr(response, "url", None)
+        self.meta = scanner.meta
+        self.bytes_read = len(scanner.buffer)
+        self.text = ""
+
+    def raise_for_status(self):
+        self.response.raise_for_status()
+
+    def fields(self, head_fields: Dict[str, str], default: Any = None) -> Dict[str, Any]:
+        """Map the scanned tags onto a manager's output keys ({output key: meta name})."""
+        return {key: self.meta.get(name) or default for key, name in head_fields.items()}
+
+
+async def fetch_head(session, url: str, wanted: Iterable[str], max_bytes: int = MAX_HEAD_BYTES,
+                     **kwargs) -> HeadResponse:
+    """Stream a page and close the connection as soon as its wanted meta tags are known."""
+    scanner = HeadScanner(wanted, max_bytes)
+    response = await session.get(url, stream=True, **kwargs)
+    try:
+        if response.status_code == 200:
+            async for chunk in response.aiter_content():
+                if scanner.feed(chunk):
+                    break
+    finally:
+        # aclose() alone waits for the whole body; quit_now makes curl abort the transfer
+        if getattr(response, "quit_now", None) is not None:
+            response.quit_now.set()
+        await response.aclose()
+    return HeadResponse(response, scanner)
+
+
+async def get_page(session, url: str, head_fields: Optional[Dict[str, str]] = None, **kwargs):
+    """``session.get``, or a head-only streaming fetch when ``head_fields`` is given."""
+    if head_fields is None:
+        return await session.get(url, **kwargs)
+    return await fetch_head(session, url, head_fields.values(), **kwargs)
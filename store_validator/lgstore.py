@@ -5,6 +5,7 @@ from asyncio import Semaphore
 import pandas as pd
 from loguru import logger
 import sys
+from store_validator.routed_ids import read_routed_ids
 
 
 class lgstoreManager:
@@ -50,7 +51,7 @@ class lgstoreManager:
                 logger.error(f"Input file not found: {input_path}")
                 return
 
-            df = pd.read_parquet(input_path)
+            df = read_routed_ids(input_path, "lg")
             input_ids = df["bundle_id"].dropna().unique().tolist()
             logger.info(f"Found {len(input_ids)} bundle IDs to process")
 
@@ -0,0 +1,35 @@
+# limits.py
+import asyncio
+from asyncio import Semaphore
+from typing import Optional, Union
+from store_validator.adaptive import AdaptiveConcurrency
+
+
+class StoreBudget:
+    """Per-store semaphore that also draws from a shared global connection budget.
+
+    It is a drop-in for a manager's ``self.semaphore``: ``async with`` holds one
+    slot of the store's own limit and one slot of the global limit. The store
+    limit is either a fixed size or the manager's AdaptiveConcurrency.
+    """
+
+    def __init__(self, store_limit: Union[int, AdaptiveConcurrency], global_semaphore: Optional[Semaphore] = None):
+        self.store_limit = store_limit
+        self.store_semaphore = Semaphore(store_limit) if isinstance(store_limit, int) else store_limit
+        self.global_semaphore = global_semaphore
+
+    async def __aenter__(self):
+        await self.store_semaphore.acquire()
+        if self.global_semaphore is not None:
+            try:
+                await self.global_semaphore.acquire()
+            except asyncio.CancelledError:
+                self.store_semaphore.release()
+                raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self.global_semaphore is not None:
+            self.global_semaphore.release()
+        self.store_semaphore.release()
+        return False
@@ -0,0 +1,55 @@
+# loop_lag.py
+import time
+import asyncio
+from loguru import logger
+from typing import Dict, List, Optional
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes up a task that sleeps ``interval``.
+
+    Anything blocking the loop (parsing a large page inline, a pandas call)
+    shows up as lag; in a healthy crawl it stays near zero.
+    """
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.samples: List[float] = []
+        self.task: Optional[asyncio.Task] = None
+
+    async def sample(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - start - self.interval))
+
+    def start(self):
+        self.samples = []
+        self.task = asyncio.get_running_loop().create_task(self.sample())
+
+    async def stop(self) -> Dict[str, float]:
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        return self.summary()
+
+    def summary(self) -> Dict[str, float]:
+        if not self.samples:
+            return {"samples": 0, "mean_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        ordered = sorted(self.samples)
+        p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+        return {
+            "samples": len(ordered),
+            "mean_ms": round(1000 * sum(ordered) / len(ordered), 2),
+            "p99_ms": round(1000 * p99, 2),
+            "max_ms": round(1000 * ordered[-1], 2),
+        }
+
+    def log(self, label: str = "event loop"):
+        stats = self.summary()
+        logger.info(f"{label} lag: mean {stats['mean_ms']}ms, p99 {stats['p99_ms']}ms, "
+                    f"max {stats['max_ms']}ms over {stats['samples']} samples")
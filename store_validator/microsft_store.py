@@ -4,27 +4,57 @@ import os
 from loguru import logger
 from pathlib import Path
 from curl_cffi.requests import AsyncSession
-from asyncio import Semaphore
-import pandas as pd
-from lxml import html
+import pyarrow as pa
 from typing import Dict, Optional, List
 import sys
 from dataclasses import dataclass, field
+from store_validator.rate_limiter import HostRateLimiter, host_limiter
+from store_validator.adaptive import AdaptiveConcurrency
+from store_validator.checkpoint import CheckpointJournal, CHECKPOINT_DIR
+from store_validator.worker_pool import WorkerPool, crawl_store
+from store_validator.parse_pool import ParsePool, parse_pool
+from store_validator.parquet_sink import ParquetSink, output_schema
+from store_validator.head_fetch import HeadResponse, get_page
+from store_validator.extractor import ExtractRules, MetaExtractor
+
+MICROSOFT_RULES = ExtractRules(meta={
+    "appstore_store_id": "appstore:store_id",
+    "appstore_developer_url": "appstore:developer_url",
+}, default="")
+microsoft_extractor = MetaExtractor(MICROSOFT_RULES)
+MICROSOFT_SCHEMA = output_schema(["url", "bundle_id", "status_code", *MICROSOFT_RULES.meta],
+                                 types={"status_code": pa.int16()}, dictionary=["appstore_developer_url"])
+
 
 @dataclass
 class MicrosoftManager:
     semaphore_limit: int = 5
-    batch_size: int = 100
+    max_concurrency: int = 32
+    queue_size: int = 1000
+    read_batch_size: int = 10_000
+    batch_size: int = 1000  # rows handed to the output writer thread at a time
+    rate_limiter: HostRateLimiter = field(default_factory=lambda: host_limiter)
+    parser: ParsePool = field(default_factory=lambda: parse_pool)
+    # Only <head> meta tags are needed, so the rest of the page is never downloaded
+    head_only: bool = True
+    head_fields: Dict[str, str] = field(default_factory=lambda: dict(MICROSOFT_RULES.meta))
+    retry_backoff: float = 2.0
+    checkpoint_dir: Path = CHECKPOINT_DIR
     output_dir: Path = Path("output")
     log_dir: Path = Path("logs")
     log_file: Path = Path("logs/microsoft_store.log")
     output_file: Path = Path("output/microsoft.parquet")
+    failure_file: Path = Path("failure_output/microsoft_failure.parquet")
     lookup_url: str = "https://apps.microsoft.com/detail/{bundle_id}?hl=en-US&gl=US"
 
     def __post_init__(self):
-        self.semaphore = Semaphore(self.semaphore_limit)
-        self.output_data_list = []
-        self.failure_data_list = []
+        self.concurrency = AdaptiveConcurrency("microsoft", initial=self.semaphore_limit,
+                                               max_limit=self.max_concurrency)
+        self.semaphore = self.concurrency
+        self.journal = CheckpointJournal("microsoft", self.checkpoint_dir)
+        self.pool = WorkerPool("microsoft", workers=self.max_concurrency, queue_size=self.queue_size)
+        self.output = ParquetSink(self.output_file, self.batch_size, schema=MICROSOFT_SCHEMA)
+        self.failures = ParquetSink(self.failure_file, self.batch_size)
         
         self.headers = {
             "accept": "*/*",
@@ -75,55 +105,36 @@ class MicrosoftManager:
     def extract_appstore_(content):
         if not content:
             return {}
-            
-        tree = html.fromstring(content)
-        
-        def get_meta_content(name: str) -> Optional[str]:
-            results = tree.xpath(f'//meta[@name="{name}"]/@content')
-            return results[0] if results else ""
-        
-        return {
-            "appstore_store_id": get_meta_content("appstore:store_id") or "",
-            "appstore_developer_url": get_meta_content("appstore:developer_url") or ""
-        }
-
-    def replace_to_parquet(self, data, file_path=None):
-        if file_path is None:
-            file_path = self.output_file
-            
-        if not data:
-            return
-
-        df = pd.DataFrame(data)
-        df = df.astype("string[pyarrow]").fillna("")
-        file_path.parent.mkdir(parents=True, exist_ok=True)
-
-        if file_path.exists():
-            file_path.unlink()
+        return microsoft_extractor.extract(content)
 
-        df.to_parquet(file_path, engine="pyarrow", index=False)
+    async def extract_meta(self, response) -> Dict[str, Optional[str]]:
+        """Meta tags from a head-only fetch, or the full page parsed in the parse pool."""
+        if isinstance(response, HeadResponse):
+            return response.fields(self.head_fields, default="")
+        return await self.parser.parse(self.extract_appstore_, response.text)
 
     async def fetch_retry_Retry(self, session: AsyncSession, bundle_id: str, retries: int=3, timeout:int=30) -> dict:
         attempt = 0
         url = self.lookup_url.format(bundle_id=bundle_id)
 
         while attempt < retries:
+            await self.rate_limiter.wait(url)
             async with self.semaphore:
                 try:
-                    response = await session.get(
-                        url,
+                    response = await self.concurrency.timed(get_page(
+                        session, url, self.head_fields if self.head_only else None,
                         timeout=timeout,
                         impersonate="chrome",
                         allow_redirects=True,
                         headers=self.headers,
                         cookies=self.cookies
-                    )
+                    ))
 
                     res_status_code = response.status_code
                     logger.info(f"[{res_status_code}] {url}")
                     response.raise_for_status()
 
-                    meta_data = self.extract_appstore_(response.text)
+                    meta_data = await self.extract_meta(response)
                     result = {
                         "url": url,
                         "bundle_id": bundle_id,
@@ -131,13 +142,8 @@ class MicrosoftManager:
                         **meta_data
                     }
 
-                    self.output_data_list.append(result)
-
-                    if len(self.output_data_list) >= self.batch_size:
-                        self.replace_to_parquet(self.output_data_list)
-                        self.output_data_list = []
-                    
-                    await asyncio.sleep(2)
+                    self.journal.done(bundle_id, result)
+                    self.output.append(result)
                     return result
                     
                 except Exception as e:
@@ -151,33 +157,14 @@ class MicrosoftManager:
                             "appstore_store_id": None,
                             "appstore_developer_url": None
                         }
-                        self.failure_data_list =failure_result
-                    await asyncio.sleep(2)
+                        self.journal.failed(bundle_id, failure_result)
+                        self.failures.append(failure_result)
+            if attempt < retries:
+                # Back off outside the semaphore so the slot serves other IDs meanwhile
+                await asyncio.sleep(self.retry_backoff)
         
         return {}
 
     async def process(self, input_path: Path):
         # self.setup_logger()
-        
-        Path("output").mkdir(exist_ok=True)
-        
-        if not input_path.exists():
-            logger.error(f"Input file not found: {input_path}")
-            return
-            
-        df = pd.read_parquet(input_path)
-        ids = df["bundle_id"].dropna().unique().tolist()
-        
-        logger.info(f"Processing {len(ids)} Microsoft bundle IDs")
-        
-        async with AsyncSession(impersonate="chrome", allow_redirects=True) as session:
-            tasks = [self.fetch_retry_Retry(session, bid) for bid in ids]
-            await asyncio.gather(*tasks)
-        
-        if self.output_data_list:
-            self.replace_to_parquet(self.output_data_list)
-            logger.info(f"Saved {len(self.output_data_list)} Microsoft results")
-            
-        if self.failure_data_list:
-            Path("failure_output").mkdir(exist_ok=True)
-            self.replace_to_parquet(self.failure_data_list, Path("failure_output/microsoft_failure.parquet"))
\ No newline at end of file
+        await crawl_store(self, "microsoft", "Microsoft Store", input_path, self.fetch_retry_Retry)
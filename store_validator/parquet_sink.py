@@ -0,0 +1,216 @@
+# parquet_sink.py
+import os
+import asyncio
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pathlib import Path
+from loguru import logger
+from datetime import datetime, timezone
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+# Columns that repeat across many rows (one developer, many apps) are stored once per row group
+DICT_STRING = pa.dictionary(pa.int32(), pa.string())
+FETCHED_AT = pa.timestamp("ns", tz="UTC")
+
+
+def output_schema(columns: Sequence[str], types: Optional[Dict[str, pa.DataType]] = None,
+                  dictionary: Sequence[str] = ()) -> pa.Schema:
+    """Schema for a store output: strings unless typed, ``dictionary`` columns dictionary-encoded.
+
+    A ``fetched_at`` column is always added; ``ParquetSink`` fills it in.
+    """
+    types = types or {}
+    fields = [(name, types.get(name, DICT_STRING if name in dictionary else pa.string())) for name in columns]
+    if "fetched_at" not in columns:
+        fields.append(("fetched_at", FETCHED_AT))
+    return pa.schema(fields)
+
+
+def to_number(value: Any, cast) -> Any:
+    """``cast(value)``, or None for missing and unparseable values such as "N/A"."""
+    if value is None or value == "":
+        return None
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        try:
+            return cast(float(value))
+        except (TypeError, ValueError, OverflowError):
+            return None
+
+
+def column_array(values: List[Any], dtype: pa.DataType) -> pa.Array:
+    value_type = dtype.value_type if pa.types.is_dictionary(dtype) else dtype
+    if pa.types.is_string(value_type) or pa.types.is_large_string(value_type):
+        values = ["" if value is None else str(value) for value in values]
+    elif pa.types.is_integer(value_type):
+        values = [to_number(value, int) for value in values]
+    elif pa.types.is_floating(value_type):
+        values = [to_number(value, float) for value in values]
+    elif pa.types.is_timestamp(value_type):
+        # datetimes from append() and ISO strings from rows replayed out of the journal
+        values = pd.to_datetime(pd.Series(values, dtype=object), utc=True, format="ISO8601", errors="coerce")
+    return pa.array(values, type=dtype)
+
+
+def read_output(path: Path, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """Read a store output with dictionary columns decoded to plain strings.
+
+    Only the requested columns that the file actually has are read, so
+    callers can list every name a store might use.
+    """
+    if columns is not None:
+        present = set(pq.read_schema(path).names)
+        columns = [name for name in dict.fromkeys(columns) if name in present]
+    table = pq.read_table(path, columns=columns)
+    for i, column in enumerate(table.schema):
+        if pa.types.is_dictionary(column.type):
+            table = table.set_column(i, column.name, table.column(i).cast(column.type.value_type))
+    return table.to_pandas()
+
+
+class ParquetSink:
+    """Streams result rows into one Parquet file from a background writer thread.
+
+    Rows are buffered until ``batch_size`` have accumulated and are then
+    handed to a single writer thread, which converts them to Arrow and appends
+    a row group to an open ``pq.ParquetWriter`` every ``row_group_size`` rows
+    (large groups keep dictionaries and compression effective); the event
+    loop only ever copies dicts. The file
+    is written as ``<name>.partial`` and renamed over the real path in
+    ``close()``, so readers never see half a file and a crashed run leaves the
+    previous output in place.
+
+    Values are coerced to the declared ``schema`` (see ``output_schema``):
+    None becomes "" in string columns, and numbers that do not parse, such
+    as a failed row's "N/A" status, become null. Without a schema every
+    column is a string, with the columns taken from the first rows. When the
+    schema has a ``fetched_at`` column, rows that arrive without one are
+    stamped with the time they were appended.
+    """
+
+    def __init__(self, path: Path, batch_size: int = 1000, schema: Optional[pa.Schema] = None,
+                 row_group_size: int = 256 * 1024, compression: str = "snappy"):
+        self.path = Path(path)
+        self.partial_path = self.path.with_name(self.path.name + ".partial")
+        self.batch_size = batch_size
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.fixed_schema = schema
+        self.stamps_rows = schema is not None and "fetched_at" in schema.names
+        self.reset()
+
+    def reset(self):
+        self.schema: Optional[pa.Schema] = self.fixed_schema
+        self.buffer: List[Dict[str, Any]] = []
+        self.futures: List[Future] = []
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.writer: Optional[pq.ParquetWriter] = None
+        self.pending_tables: List[pa.Table] = []
+        self.pending_rows = 0
+        self.rows = 0
+        self.dropped_columns: set = set()
+
+    # -- loop side ------------------------------------------------------------
+
+    def append(self, row: Dict[str, Any]):
+        if self.stamps_rows and row.get("fetched_at") is None:
+            row = {**row, "fetched_at": datetime.now(timezone.utc)}
+        self.buffer.append(row)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def extend(self, rows: Iterable[Dict[str, Any]]):
+        for row in rows:
+            self.append(row)
+
+    def flush(self):
+        """Hand the buffered rows to the writer thread without waiting for them."""
+        if not self.buffer:
+            return
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"sink-{self.path.stem}")
+        rows, self.buffer = self.buffer, []
+        self.rows += len(rows)
+        for future in self.futures:
+            if future.done():
+                future.result()  # surfaces a failed write instead of losing it silently
+        self.futures = [future for future in self.futures if not future.done()]
+        self.futures.append(self.executor.submit(self.write_rows, rows))
+
+    async def close(self) -> int:
+        """Write what is left, finalize the file and move it into place; returns the row count."""
+        self.flush()
+        rows = self.rows
+        if self.executor is None:
+            return 0
+        try:
+            for future in self.futures:
+                await asyncio.wrap_future(future)
+            await asyncio.wrap_future(self.executor.submit(self.finalize))
+        except BaseException:
+            # The caller's abort() is a no-op once the sink is reset, so the writer and partial file go now
+            self.abort()
+            raise
+        self.executor.shutdown(wait=False)
+        self.reset()
+        logger.info(f"Wrote {rows} rows to {self.path}")
+        return rows
+
+    def abort(self):
+        """Drop the partial file; a no-op once ``close()`` has run."""
+        if self.executor is None:
+            self.buffer = []
+            return
+        self.executor.submit(self.discard)
+        self.executor.shutdown(wait=True)
+        logger.warning(f"Discarded partial output {self.partial_path} ({self.rows} rows)")
+        self.reset()
+
+    # -- writer thread --------------------------------------------------------
+
+    def to_table(self, rows: List[Dict[str, Any]]) -> pa.Table:
+        if self.schema is None:
+            names = list(dict.fromkeys(key for row in rows for key in row))
+            self.schema = pa.schema([(name, pa.string()) for name in names])
+        extra = {key for row in rows for key in row} - set(self.schema.names) - self.dropped_columns
+        if extra:
+            self.dropped_columns |= extra
+            logger.warning(f"{self.path.name}: columns {sorted(extra)} are not in the schema and are dropped")
+        columns = [column_array([row.get(name) for row in rows], dtype)
+                   for name, dtype in zip(self.schema.names, self.schema.types)]
+        return pa.Table.from_arrays(columns, schema=self.schema)
+
+    def write_rows(self, rows: List[Dict[str, Any]]):
+        table = self.to_table(rows)
+        self.pending_tables.append(table)
+        self.pending_rows += table.num_rows
+        if self.pending_rows >= self.row_group_size:
+            self.write_row_group()
+
+    def write_row_group(self):
+        if not self.pending_tables:
+            return
+        # Each batch brought its own dictionaries; one shared dictionary per row group
+        table = pa.concat_tables(self.pending_tables).unify_dictionaries().combine_chunks()
+        self.pending_tables, self.pending_rows = [], 0
+        if self.writer is None:
+            self.partial_path.parent.mkdir(parents=True, exist_ok=True)
+            self.writer = pq.ParquetWriter(self.partial_path, table.schema, compression=self.compression)
+        self.writer.write_table(table, row_group_size=self.row_group_size)
+
+    def finalize(self):
+        self.write_row_group()
+        self.writer.close()
+        self.writer = None
+        os.replace(self.partial_path, self.path)
+
+    def discard(self):
+        try:
+            if self.writer is not None:
+                self.writer.close()
+        finally:
+            self.writer = None
+            self.partial_path.unlink(missing_ok=True)
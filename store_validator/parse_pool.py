@@ -0,0 +1,58 @@
+# parse_pool.py
+import os
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from loguru import logger
+from typing import Any, Callable, Optional
+
+PARSE_MODES = ("inline", "thread", "process")
+
+
+class ParsePool:
+    """Runs HTML/JSON extractors off the event loop.
+
+    ``mode`` is "thread" (default; lxml drops the GIL while parsing),
+    "process" (parsing is CPU-bound and the pages are large) or "inline".
+    Bodies shorter than ``inline_below`` characters are parsed in place since
+    the hand-off would cost more than the parse. In process mode the
+    extractor must be a module-level function or staticmethod.
+    """
+
+    def __init__(self, mode: str = "thread", workers: Optional[int] = None, inline_below: int = 16_384):
+        self.executor: Optional[Executor] = None
+        self.configure(mode, workers, inline_below)
+
+    def configure(self, mode: str = "thread", workers: Optional[int] = None, inline_below: int = 16_384):
+        if mode not in PARSE_MODES:
+            raise ValueError(f"Unknown parse mode {mode!r}, expected one of {PARSE_MODES}")
+        self.close()
+        self.mode = mode
+        self.workers = workers or min(8, os.cpu_count() or 1)
+        self.inline_below = inline_below
+
+    def get_executor(self) -> Optional[Executor]:
+        if self.mode == "inline":
+            return None
+        if self.executor is None:
+            if self.mode == "process":
+                self.executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="parse")
+            logger.info(f"Parse pool started: {self.mode} x{self.workers}")
+        return self.executor
+
+    async def parse(self, extractor: Callable[[Any], Any], content: Any) -> Any:
+        """Return ``extractor(content)``, computed in the pool unless the body is small."""
+        executor = self.get_executor()
+        if executor is None or (content is not None and len(content) < self.inline_below):
+            return extractor(content)
+        return await asyncio.get_running_loop().run_in_executor(executor, extractor, content)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+
+# Shared by every store manager; change with parse_pool.configure(...)
+parse_pool = ParsePool()
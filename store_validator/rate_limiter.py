@@ -0,0 +1,92 @@
+# rate_limiter.py
+import time
+import asyncio
+from urllib.parse import urlsplit
+from loguru import logger
+from typing import Dict, Optional
+
+# Requests per second allowed per host; burst is how many can go out back-to-back
+DEFAULT_HOST_RATES: Dict[str, float] = {
+    "itunes.apple.com": 5.0,
+    "apps.apple.com": 3.0,
+    "play.google.com": 5.0,
+    "www.amazon.com": 1.0,
+    "apps.microsoft.com": 4.0,
+    "www.zeasn.tv": 3.0,
+    "www.samsung.com": 3.0,
+    "galaxystore.samsung.com": 3.0,
+}
+DEFAULT_RATE = 2.0
+
+
+class TokenBucket:
+    """Async token bucket: ``rate`` tokens per second, at most ``burst`` saved up."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = None
+        self.loop = None
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, tokens: float = 1.0):
+        # The lock keeps waiters first-come first-served; one lock per event loop
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            self.lock, self.loop = asyncio.Lock(), loop
+        async with self.lock:
+            self.refill()
+            while self.tokens < tokens:
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+                self.refill()
+            self.tokens -= tokens
+
+    def set_rate(self, rate: float, burst: Optional[float] = None):
+        self.refill()
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.tokens = min(self.tokens, self.burst)
+
+
+class HostRateLimiter:
+    """One token bucket per host, shared by every store manager.
+
+    This limits request *rate*; how many requests are in flight is still the
+    manager's semaphore. Waiting for a token never holds a concurrency slot.
+    """
+
+    def __init__(self, rates: Optional[Dict[str, float]] = None, default_rate: float = DEFAULT_RATE):
+        self.rates = dict(DEFAULT_HOST_RATES if rates is None else rates)
+        self.default_rate = default_rate
+        self.buckets: Dict[str, TokenBucket] = {}
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        return urlsplit(url).netloc.lower()
+
+    def bucket(self, host: str) -> TokenBucket:
+        if host not in self.buckets:
+            self.buckets[host] = TokenBucket(self.rates.get(host, self.default_rate))
+        return self.buckets[host]
+
+    def configure(self, rates: Dict[str, float]):
+        """Override per-host rates (requests/second)."""
+        for host, rate in rates.items():
+            self.rates[host] = rate
+            if host in self.buckets:
+                self.buckets[host].set_rate(rate)
+            logger.info(f"Rate limit for {host} set to {rate} req/s")
+
+    async def wait(self, url: str):
+        """Block until a request to this URL's host is allowed."""
+        await self.bucket(self.host_of(url)).acquire()
+
+
+# Process-wide limiter so stores that share a host also share its budget
+host_limiter = HostRateLimiter()
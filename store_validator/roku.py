@@ -1,5 +1,6 @@
 # CORRECTED roku.py
 import asyncio
+import re
 from pathlib import Path
 import pandas as pd
 from loguru import logger
@@ -7,6 +8,7 @@ from typing import Dict, Optional, List
 from dataclasses import dataclass, field
 from asyncio import Semaphore
 import sys
+from store_validator.routed_ids import read_routed_ids
 
 @dataclass
 class rokuManager:
@@ -83,9 +85,9 @@ class rokuManager:
                 return
 
             # Read input IDs
-            df = pd.read_parquet(input_path)
+            df = read_routed_ids(input_path, "roku")
             input_ids = df["bundle_id"].dropna().astype(str).str.strip().tolist()
-            input_ids = [bid.replace(".0", "") for bid in input_ids]
+            input_ids = [re.sub(r"\.0$", "", bid) for bid in input_ids]
 
             logger.info(f"Found {len(input_ids)} bundle IDs to process")
 
@@ -0,0 +1,101 @@
+# routed_ids.py
+import shutil
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pathlib import Path
+from loguru import logger
+from typing import Dict, Iterator, List
+
+ROUTED_SCHEMA = pa.schema([("bundle_id", pa.string()), ("store", pa.string())])
+PARTITIONING = ds.partitioning(pa.schema([("store", pa.string())]), flavor="hive")
+
+
+class RoutedDatasetWriter:
+    """Writes routed IDs as one hive-partitioned dataset: routed_dir/store=<name>/*.parquet."""
+
+    def __init__(self, routed_dir: Path):
+        self.routed_dir = Path(routed_dir)
+        self.parts = 0
+        self.counts: Dict[str, int] = {}
+
+    def clear(self):
+        """Remove the previous run's partitions and the old one-file-per-store layout."""
+        self.routed_dir.mkdir(exist_ok=True, parents=True)
+        for old in self.routed_dir.glob("store=*"):
+            shutil.rmtree(old, ignore_errors=True)
+        for old in self.routed_dir.glob("*.parquet"):
+            old.unlink()
+        self.parts = 0
+        self.counts = {}
+
+    def write(self, routes: pd.DataFrame):
+        """Write one batch of (bundle_id, store) rows; arrow splits it by store in a single pass."""
+        if routes.empty:
+            return
+        table = pa.Table.from_pandas(routes[["bundle_id", "store"]].astype(str), schema=ROUTED_SCHEMA,
+                                     preserve_index=False)
+        ds.write_dataset(
+            table,
+            self.routed_dir,
+            format="parquet",
+            partitioning=PARTITIONING,
+            basename_template=f"part-{self.parts}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+        self.parts += 1
+        for store, count in routes["store"].value_counts().items():
+            self.counts[store] = self.counts.get(store, 0) + int(count)
+
+
+def routed_dataset(routed_dir: Path) -> ds.Dataset:
+    return ds.dataset(Path(routed_dir), format="parquet", partitioning=PARTITIONING)
+
+
+def read_routed_ids(input_path: Path, store: str) -> pd.DataFrame:
+    """Read one store's bundle IDs.
+
+    input_path is either the partitioned routed_ids directory (only the
+    store=<name> partition is scanned) or a legacy per-store parquet file.
+    """
+    input_path = Path(input_path)
+    if input_path.is_file():
+        return pd.read_parquet(input_path, columns=["bundle_id"])
+    if not (input_path / f"store={store}").exists():
+        return pd.DataFrame(columns=["bundle_id"])
+    table = routed_dataset(input_path).to_table(columns=["bundle_id"], filter=ds.field("store") == store)
+    return table.to_pandas()
+
+
+def iter_routed_id_batches(input_path: Path, store: str, batch_size: int = 10_000) -> Iterator[List[str]]:
+    """Stream one store's bundle IDs in batches instead of loading the whole partition."""
+    input_path = Path(input_path)
+    if input_path.is_file():
+        batches = pq.ParquetFile(input_path).iter_batches(batch_size=batch_size, columns=["bundle_id"])
+    elif (input_path / f"store={store}").exists():
+        batches = routed_dataset(input_path).to_batches(columns=["bundle_id"], filter=ds.field("store") == store,
+                                                        batch_size=batch_size)
+    else:
+        return
+    for batch in batches:
+        ids = batch.column(0).drop_null().cast(pa.string()).to_pylist()
+        if ids:
+            yield list(dict.fromkeys(ids))
+
+
+def count_routed_ids(routed_dir: Path) -> Dict[str, int]:
+    """Row count per store from the parquet footers only (no column data is read)."""
+    counts: Dict[str, int] = {}
+    routed_dir = Path(routed_dir)
+    if not any(routed_dir.glob("store=*")):
+        return counts
+    dataset = routed_dataset(routed_dir)
+    for part_dir in routed_dir.glob("store=*"):
+        store = part_dir.name.split("=", 1)[1]
+        try:
+            fragments = dataset.get_fragments(filter=ds.field("store") == store)
+            counts[store] = sum(frag.metadata.num_rows for frag in fragments)
+        except Exception as e:
+            logger.error(f"Could not count routed IDs for {store}: {e}")
+    return counts
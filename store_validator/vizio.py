@@ -6,6 +6,7 @@ from loguru import logger
 from typing import Dict, List
 from dataclasses import dataclass, field
 import sys
+from store_validator.routed_ids import read_routed_ids
 
 @dataclass
 class VizioManager:
@@ -62,7 +63,7 @@ class VizioManager:
             logger.error(f"Input file not found: {input_path}")
             return
 
-        df = pd.read_parquet(input_path)
+        df = read_routed_ids(input_path, "vizio")
         input_ids = df["bundle_id"].dropna().unique().tolist()
         
         logger.info(f"Processing {len(input_ids)} Vizio bundle IDs")
@@ -0,0 +1,137 @@
+# worker_pool.py
+import time
+import asyncio
+from pathlib import Path
+from contextlib import nullcontext
+from loguru import logger
+from curl_cffi.requests import AsyncSession
+from typing import Any, AsyncContextManager, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from store_validator.routed_ids import iter_routed_id_batches
+
+_STOP = object()
+DEFAULT_SESSION_OPTIONS: Dict[str, Any] = {"impersonate": "chrome", "allow_redirects": True}
+
+
+class WorkerPool:
+    """Fixed set of workers pulling bundle IDs from a bounded queue.
+
+    A producer feeds the queue from an iterator of ID batches (e.g. a
+    streaming routed-parquet reader), reading the next batch in a thread and
+    blocking when the queue is full. Memory stays flat however many IDs a
+    store has: at most ``queue_size`` IDs are queued and ``workers``
+    requests are being handled at any time, served in input order.
+    """
+
+    def __init__(self, name: str, workers: int = 32, queue_size: int = 1000):
+        self.name = name
+        self.workers = workers
+        self.queue_size = queue_size
+        self.stats: Dict[str, int] = {}
+
+    async def run(self, batches: Iterable[List[str]], handler: Callable[[Any], Awaitable[Any]],
+                  batch_filter: Optional[Callable[[List[str]], List[str]]] = None,
+                  chunk_size: int = 1) -> Dict[str, int]:
+        """Call ``handler(bundle_id)`` for every ID; ``batch_filter`` drops IDs (e.g. already done).
+
+        With ``chunk_size`` > 1 the handler gets lists of up to that many IDs
+        instead, for endpoints that answer several IDs per request.
+        """
+        self.stats = {"read": 0, "queued": 0, "processed": 0, "errors": 0}
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, self.queue_size // chunk_size))
+        start = time.perf_counter()
+
+        async def produce():
+            iterator = iter(batches)
+            while True:
+                # Parquet decoding happens off the event loop
+                batch = await asyncio.to_thread(next, iterator, None)
+                if batch is None:
+                    break
+                self.stats["read"] += len(batch)
+                if batch_filter is not None:
+                    batch = batch_filter(batch)
+                if chunk_size > 1:
+                    for i in range(0, len(batch), chunk_size):
+                        chunk = batch[i:i + chunk_size]
+                        await queue.put(chunk)
+                        self.stats["queued"] += len(chunk)
+                    continue
+                for bundle_id in batch:
+                    await queue.put(bundle_id)
+                    self.stats["queued"] += 1
+            for _ in range(self.workers):
+                await queue.put(_STOP)
+
+        async def work():
+            while True:
+                item = await queue.get()
+                if item is _STOP:
+                    return
+                try:
+                    await handler(item)
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    logger.error(f"{self.name}: unhandled error for {item}: {e}")
+                self.stats["processed"] += len(item) if chunk_size > 1 else 1
+
+        producer = asyncio.create_task(produce())
+        workers = [asyncio.create_task(work()) for _ in range(self.workers)]
+        try:
+            await producer
+            await asyncio.gather(*workers)
+        finally:
+            # A failed reader or a cancelled run must not leave workers waiting on the queue
+            for task in [producer, *workers]:
+                task.cancel()
+        logger.info(f"{self.name}: {self.stats['processed']} IDs processed by {self.workers} workers "
+                    f"in {time.perf_counter() - start:.1f}s ({self.stats['read'] - self.stats['queued']} skipped)")
+        return self.stats
+
+
+async def crawl_store(manager, store: str, label: str, input_path: Path,
+                      fetch: Callable[[AsyncSession, Any], Awaitable[Any]], chunk_size: int = 1,
+                      session_options: Optional[Dict[str, Any]] = None,
+                      stage: Optional[Callable[[AsyncSession], AsyncContextManager]] = None
+                      ) -> Optional[Tuple[int, int]]:
+    """The ``process`` of a network store: every routed ID of ``store`` through ``fetch(session, id)``.
+
+    ``manager`` provides the ``journal``, ``pool``, ``output`` sink (and
+    ``failures`` sink, if it keeps one), ``read_batch_size`` and
+    ``max_concurrency``; the session's connection pool is sized to the
+    latter. ``chunk_size`` is passed on to ``WorkerPool.run``, and ``stage``
+    wraps the pool run for managers with a second stage to start and drain.
+    Returns the rows written and failed, or None without input.
+    """
+    if not input_path.exists():
+        logger.error(f"Input file not found: {input_path}")
+        return None
+    logger.info(f"Processing {label} bundle IDs")
+    manager.journal.start()
+    sinks = [sink for sink in (manager.output, getattr(manager, "failures", None)) if sink is not None]
+    options = DEFAULT_SESSION_OPTIONS if session_options is None else session_options
+    try:
+        async with AsyncSession(max_clients=manager.max_concurrency, **options) as session:
+            async with (stage(session) if stage is not None else nullcontext()):
+                # Workers pull IDs from a bounded queue fed by a streaming reader of the routed partition
+                await manager.pool.run(
+                    iter_routed_id_batches(input_path, store, manager.read_batch_size),
+                    lambda item: fetch(session, item),
+                    # IDs finished before a restart are skipped and their stored rows streamed out again
+                    batch_filter=lambda ids: manager.journal.pending(ids, resumed=manager.output.extend),
+                    chunk_size=chunk_size,
+                )
+        counts = [await sink.close() for sink in sinks]
+    finally:
+        # No-op after a clean close; otherwise the partial file is dropped and the old output kept
+        for sink in sinks:
+            sink.abort()
+
+    written, failed = counts[0], sum(counts[1:])
+    if written:
+        logger.success(f"{label} data written to {manager.output_file} with {written} records")
+    else:
+        logger.warning(f"No {label} data to write")
+    if failed:
+        logger.info(f"Saved {failed} failed {label} results to {manager.failure_file}")
+    manager.journal.finish()
+    return written, failed
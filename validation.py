@@ -4,6 +4,13 @@ import pandas as pd
 from pathlib import Path
 from loguru import logger
 from typing import Optional
+from bundle_classifier import BundleClassifier
+from bundle_cache import BundleCache
+from bundle_canonicalizer import BundleCanonicalizer
+from routing_engine import RoutingEngine
+from freshness import FreshnessPolicy
+from input_reader import InputSource, iter_bundle_id_chunks
+from store_validator.routed_ids import RoutedDatasetWriter
 
 class BundleValidator:
     """Validates and routes bundle IDs to store-specific files with caching and logging."""
@@ -23,8 +30,11 @@ class BundleValidator:
         "vizio": r"^vizio\.[a-z0-9][a-z0-9.\-\+]*$"
     }
 
-    def __init__(self, cache_path: str = "routed_ids_cache/bundle_cache.parquet",
-                 routed_path: str = "routed_ids", log_dir: str = "logs"):
+    def __init__(self, cache_path: str = "routed_ids_cache/bundle_cache.sqlite",
+                 routed_path: str = "routed_ids", log_dir: str = "logs",
+                 legacy_cache_path: str = "routed_ids_cache/bundle_cache.parquet",
+                 router: Optional[RoutingEngine] = None,
+                 freshness: Optional[FreshnessPolicy] = None):
         """Initialize the validator, ensuring directories and log setup."""
         self.CACHE_PATH = Path(cache_path)
         self.ROUTED_PATH = Path(routed_path)
@@ -37,6 +47,21 @@ class BundleValidator:
 
         # Logger setup
         logger.add(self.LOG_DIR / "validation.log", rotation="10 days", level="INFO")
+
+        # Patterns are compiled once and applied to whole columns
+        self.classifier = BundleClassifier(self.STORE_PATTERNS)
+
+        # Keyed routing cache; the old parquet cache is imported on first use
+        self.cache = BundleCache(self.CACHE_PATH, legacy_parquet=Path(legacy_cache_path))
+
+        # Normalizes raw inputs before anything is routed
+        self.canonicalizer = BundleCanonicalizer()
+
+        # Decides which candidate stores are worth a fetch
+        self.router = router if router is not None else RoutingEngine()
+
+        # Drops routes whose developer_url was resolved within the store's TTL
+        self.freshness = freshness
     
 # In validation.py, fix the extract_id method:
     def extract_id(self, text: str, pattern: str) -> Optional[str]:  # FIXED: Added return type
@@ -47,82 +72,104 @@ class BundleValidator:
             except IndexError:
                 logger.error(f"No group(1) in regex match for: {text} using pattern: {pattern}")
         return None
-    def load_cache(self) -> pd.DataFrame:
-        if self.CACHE_PATH.exists():
-            return pd.read_parquet(self.CACHE_PATH)
-        return pd.DataFrame(columns=["bundle_id", "store"])
-    def save_cache(self, df: pd.DataFrame):
-    # Load existing cache
-        if self.CACHE_PATH.exists():
-            existing_df = pd.read_parquet(self.CACHE_PATH)
-            df = pd.concat([existing_df, df], ignore_index=True)
-
-        # Drop duplicates by bundle_id and store
-        df = df.drop_duplicates(subset=["bundle_id", "store"], keep="last")
-
-        # Save back to cache
-        df.to_parquet(self.CACHE_PATH, index=False)
-
+    def load_cache(self, bundle_ids) -> pd.DataFrame:
+        """Return cached routes for the given IDs (one batched query)."""
+        return self.cache.lookup(bundle_ids)
+
+    def save_cache(self, df: pd.DataFrame) -> int:
+        """Append only the new (bundle_id, store) routes to the cache."""
+        return self.cache.add(df)
+
+
+    def route_chunk(self, values: pd.Series, totals: dict) -> pd.DataFrame:
+        """Canonicalize, de-duplicate, classify and decide routes for one input chunk."""
+        # Collapse URL / prefixed / float variants to one (store, canonical_id) pair
+        canon_df = self.canonicalizer.canonicalize(values)
+        totals["unique_raw"] += self.canonicalizer.last_stats["unique_raw"]
+
+        # Only IDs not already routed earlier in this run
+        fresh_ids = self.cache.unseen(canon_df["bundle_id"].unique())
+        canon_df = canon_df[canon_df["bundle_id"].isin(fresh_ids)]
+        totals["canonical"] += len(fresh_ids)
+
+        # IDs whose store is given by their URL/prefix skip pattern routing
+        pinned_df = (
+            canon_df[canon_df["store_hint"].notna()][["bundle_id", "store_hint"]]
+            .rename(columns={"store_hint": "store"})
+            .drop_duplicates("bundle_id")
+        )
+        totals["pinned"] += len(pinned_df)
+        pinned_ids = set(pinned_df["bundle_id"])
+        bundle_ids = [bid for bid in canon_df["bundle_id"].unique() if bid not in pinned_ids]
+
+        # Check cache first
+        cache_df = self.load_cache(bundle_ids)
+        ids_series = pd.Series(bundle_ids, dtype=object)
+        cached_mask = ids_series.isin(cache_df["bundle_id"])
+        totals["cached"] += int(cached_mask.sum())
+
+        # Classify all uncached IDs in one vectorized pass
+        uncached = ids_series[~cached_mask].reset_index(drop=True)
+        matrix = self.classifier.classify(uncached)
+        unmatched = uncached[~matrix.any(axis=1)]
+        totals["unmatched"] += len(unmatched)
+        if not unmatched.empty:
+            logger.warning(f"No store matched for {len(unmatched)} IDs, e.g. {unmatched.head(5).tolist()}")
+
+        # Update and save cache (the cache keeps every candidate store)
+        new_df = self.classifier.route(uncached, matrix)
+        totals["added"] += self.save_cache(new_df)
+
+        # Pick the store(s) each ID is actually sent to
+        decision = self.router.decide(pd.concat([cache_df, new_df], ignore_index=True))
+        for key, value in self.router.last_stats.items():
+            totals[key] = totals.get(key, 0) + value
+        selected = decision[decision["selected"]][["bundle_id", "store"]]
+        routes = pd.concat([selected, pinned_df], ignore_index=True)
+
+        # Recently resolved IDs never reach a store processor
+        if self.freshness is not None:
+            stale = self.freshness.filter(routes)
+            totals["fresh_skipped"] += len(routes) - len(stale)
+            routes = stale
+        return routes
 
     #  Main Function 
-    async def validate_and_route_ids(self,excel_path: str) -> Path:
-        print(f" Reading Excel file: {excel_path}")
-        logger.info(f"Reading Excel file: {excel_path}")
-        
-        df = pd.read_excel(excel_path)
-
-        if "bundle_id" not in df.columns:
-            error_msg = "Missing 'bundle_id' column"
-            print(f" {error_msg}")
-            logger.error(error_msg)
-            raise ValueError("Excel must contain a 'bundle_id' column")
-
-        bundle_ids = df["bundle_id"].dropna().astype(str).unique()
-        current_ids = set(bundle_ids)
-        print(f" Found {len(bundle_ids)} unique bundle IDs to process")
-        logger.info(f"Found {len(bundle_ids)} unique bundle IDs")
-        
-        cache_df = self.load_cache()
-        print(f" Cache contains {len(cache_df)} previously routed IDs")
-        logger.info(f"Cache contains {len(cache_df)} previously routed IDs")
+    async def validate_and_route_ids(self, source: InputSource, column: str = "bundle_id",
+                                     chunk_size: int = 500_000) -> Path:
+        """Route bundle IDs from a file path, DataFrame or Arrow table, one chunk at a time."""
+        label = source if isinstance(source, (str, Path)) else type(source).__name__
+        print(f" Reading input: {label}")
+        logger.info(f"Reading input: {label}")
+
+        print(f" Cache contains {len(self.cache)} previously routed IDs")
+        logger.info(f"Cache contains {len(self.cache)} previously routed IDs")
+        self.cache.begin_run()
 
-        new_entries = []
         store_counts = {store: 0 for store in self.STORE_PATTERNS.keys()}
-        store_counts["unmatched"] = 0
+        totals = {"rows": 0, "unique_raw": 0, "canonical": 0, "pinned": 0, "cached": 0,
+                  "added": 0, "unmatched": 0, "fresh_skipped": 0}
+        writer = RoutedDatasetWriter(self.ROUTED_PATH)
+        writer.clear()
 
         print("\n Analyzing bundle IDs:")
         print("-" * 60)
         logger.info("Starting bundle ID analysis")
-        
-        for bid in bundle_ids:
-            bid_clean = bid.strip()
-            
-            # Check cache first
-            cached = cache_df[cache_df["bundle_id"] == bid_clean]
-            if not cached.empty:
-                store_name = cached.iloc[0]["store"]
-                print(f"     {bid_clean:<20} -> {store_name.upper()} (from cache)")
-                logger.debug(f"ID {bid_clean} routed to {store_name} (from cache)")
-                store_counts[store_name] += 1
-                continue
-
-            matched = False
-            for store, pattern in self.STORE_PATTERNS.items():
-                try:
-                    if re.search(pattern, bid_clean, re.IGNORECASE):
-                        new_entries.append({"bundle_id": bid_clean, "store": store})
-                        store_counts[store] += 1
-                        matched = True
-                        print(f"    {bid_clean:<20} -> {store.upper()}")
-                        logger.info(f"ID {bid_clean} routed to {store}")
-                        #break
-                except Exception as e:
-                    logger.error(f"Regex error for pattern {pattern}: {e}")
-
-            if not matched:
-                store_counts["unmatched"] += 1
-                print(f"    {bid_clean:<20} -> UNMATCHED")
-                logger.warning(f"No store matched for: {bid_clean}")
+
+        # Each chunk's routes go to routed_ids/store=<name>/ in one partitioned write
+        for chunk_no, chunk in enumerate(iter_bundle_id_chunks(source, column, chunk_size), start=1):
+            totals["rows"] += len(chunk)
+            routes = self.route_chunk(chunk, totals)
+            writer.write(routes)
+            logger.info(f"Chunk {chunk_no}: {len(chunk)} rows, {len(routes)} routes")
+        for store_name, count in writer.counts.items():
+            store_counts[store_name] = store_counts.get(store_name, 0) + count
+
+        dedupe_ratio = round(totals["unique_raw"] / totals["canonical"], 4) if totals["canonical"] else 1.0
+        print(f" Read {totals['rows']} rows -> {totals['canonical']} canonical bundle IDs "
+              f"(dedupe ratio {dedupe_ratio})")
+        print(f" {totals['cached']} IDs routed from cache, {totals['added']} new entries saved to cache")
+        store_counts["unmatched"] = totals["unmatched"]
 
         # Print summary
         print("\n" + "=" * 60)
@@ -131,6 +178,14 @@ class BundleValidator:
         for store, count in store_counts.items():
             if count > 0:
                 print(f"   {store.upper():<15}: {count:>3} IDs")
+        print("-" * 60)
+        print(f"   Pinned by URL / prefix    : {totals['pinned']}")
+        print(f"   Candidate routes          : {totals.get('candidates', 0)}")
+        print(f"   Resolved by local catalog : {totals.get('local_hits', 0)}")
+        print(f"   Network fetches scheduled : {totals.get('network_selected', 0)}")
+        print(f"   Secondary-store fetches   : {totals.get('secondary_selected', 0)}")
+        print(f"   Redundant fetches avoided : {totals.get('redundant_fetches_avoided', 0)}")
+        print(f"   Skipped, still fresh      : {totals['fresh_skipped']}")
         print("=" * 60)
         
         # Log summary
@@ -138,41 +193,15 @@ class BundleValidator:
         for store, count in store_counts.items():
             if count > 0:
                 logger.info(f"  {store}: {count} IDs")
+        logger.info(f"Routing totals: {totals} (dedupe ratio {dedupe_ratio})")
 
-        # Update and save cache
-        if new_entries:
-            new_df = pd.DataFrame(new_entries)
-            combined_df = pd.concat([cache_df, new_df], ignore_index=True).drop_duplicates()
-            self.save_cache(combined_df)
-            print(f" Saved {len(new_entries)} new entries to cache")
-            logger.info(f"Saved {len(new_entries)} new entries to cache")
-        else:
-            print("ℹ  No new bundle IDs found to add to cache")
-            logger.info("No new bundle IDs found to add to cache")
-            combined_df = cache_df
-
-        # Ensure all store files exist
-        print(f"\nSaving routed IDs to store files...")
-        logger.info("Saving routed IDs to store files")
-        
+        print(f"\nRouted IDs saved to partitioned dataset {self.ROUTED_PATH}:")
         for store in self.STORE_PATTERNS.keys():
-            out_file = self.ROUTED_PATH / f"{store}.parquet"
-            store_ids = combined_df[
-            (combined_df["store"] == store) &
-            (combined_df["bundle_id"].isin(current_ids))
-        ]["bundle_id"]
-
-            
-            if not store_ids.empty:
-                store_ids.to_frame().to_parquet(out_file, index=False)
-                print(f"    {store.upper():<15}: {len(store_ids):>3} IDs -> {out_file}")
-                logger.info(f"Saved {len(store_ids)} IDs to {store} store file")
+            if store_counts[store]:
+                print(f"    {store.upper():<15}: {store_counts[store]:>3} IDs -> {self.ROUTED_PATH / f'store={store}'}")
             else:
-                # Create empty file for consistency
-                pd.DataFrame(columns=["bundle_id"]).to_parquet(out_file, index=False)
                 print(f"    {store.upper():<15}: No IDs")
-                logger.debug(f"Created empty file for {store} store")
 
         print(f" All routing completed successfully!")
         logger.success("All routing completed successfully")
-        return self.ROUTED_PATH
\ No newline at end of file
+        return self.ROUTED_PATH